@@ -136,6 +136,14 @@ if FORCE_SCRIPT_NAME:
 else:
     MEDIA_URL = "/media/"
 
+# Cache shared by every worker process on the host; holds the version tokens of per-process caches
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("CACHE_DIR", str(BASE_DIR / "cache")),
+    }
+}
+
 # Logging
 LOG_DIR = BASE_DIR / "logs"
 LOG_DIR.mkdir(exist_ok=True)
@@ -175,3 +183,14 @@ LOGGING = {
 TODOIST_API_TOKEN = os.getenv("TODOIST_API_TOKEN", "")
 TODOIST_CLIENT_ID = os.getenv("TODOIST_CLIENT_ID", "")
 TODOIST_CLIENT_SECRET = os.getenv("TODOIST_CLIENT_SECRET", "")
+
+# Seconds before the local mirror of Todoist projects, sections and labels is considered stale
+TODOIST_MIRROR_TTL = int(os.getenv("TODOIST_MIRROR_TTL", 6 * 60 * 60))
+
+# Request profiling (see tasks/profiling.py): staff can profile a request with an
+# X-Profile header or ?_profile, and 1 in PROFILING_SAMPLE_RATE requests is sampled (0 = off)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False").lower() in ("true", "1", "yes")
+PROFILING_SAMPLE_RATE = int(os.getenv("PROFILING_SAMPLE_RATE", 0))
+
+if PROFILING_ENABLED:
+    MIDDLEWARE.append("tasks.profiling.ProfilingMiddleware")
@@ -31,6 +31,18 @@ WAGTAILADMIN_BASE_URL = os.getenv("WAGTAILADMIN_BASE_URL", "https://tasks.allotm
 
 DRY_RUN_TASK_CREATION = False
 
+# Serve collected static files from the app: content-hashed names cached forever, with gzip
+# and brotli variants written by collectstatic. WhiteNoise strips FORCE_SCRIPT_NAME from STATIC_URL.
+MIDDLEWARE.insert(  # noqa: F405
+    MIDDLEWARE.index("django.middleware.security.SecurityMiddleware") + 1,  # noqa: F405
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+)
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "tasks.storage.MinifiedManifestStaticFilesStorage"},
+}
+
 # Override log directory to match the mounted volume (/logs in container)
 LOG_DIR = Path("/logs")
 
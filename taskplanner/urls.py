@@ -4,7 +4,20 @@ from django.contrib import admin
 from django.urls import include, path
 from neapolitan.views import Role
 
-from tasks.views import TaskGroupTemplateCRUDView, home, template_list, template_tasks
+from tasks.views import (
+    TaskGroupTemplateCRUDView,
+    analytics,
+    create_task_group,
+    events,
+    home,
+    profile_detail,
+    profile_list,
+    refresh_todoist_mirror,
+    resume_task_group_creation,
+    template_list,
+    template_tasks,
+    webhook,
+)
 
 urlpatterns = [
     # Neapolitan CRUD views (before Django admin catch-all)
@@ -29,8 +42,20 @@ urlpatterns = [
         TaskGroupTemplateCRUDView.as_view(role=Role.DELETE),
         name="taskgrouptemplate-delete",
     ),
+    path("admin/todoist/refresh/", refresh_todoist_mirror, name="todoist-mirror-refresh"),
+    path("admin/profiles/", profile_list, name="profile-list"),
+    path("admin/profiles/<str:name>/", profile_detail, name="profile-detail"),
     # Django admin
     path("admin/", admin.site.urls),
+    # Idempotent front for todosync's create form (before the todosync include)
+    path("todosync/create/", create_task_group, name="create-task-group"),
+    path(
+        "todosync/create/<int:pk>/resume/",
+        resume_task_group_creation,
+        name="resume-task-group-creation",
+    ),
+    # todosync's webhook, with label action rules served from a per-process cache
+    path("todosync/webhook/", webhook, name="webhook"),
     # Todosync (webhook + create form)
     path("todosync/", include("todosync.urls")),
     # Allauth
@@ -39,6 +64,8 @@ urlpatterns = [
     path("", home, name="home"),
     path("templates/", template_list, name="template-list"),
     path("templates/<int:pk>/tasks/", template_tasks, name="template-tasks"),
+    path("analytics/", analytics, name="analytics"),
+    path("events/", events, name="events"),
 ]
 
 if settings.DEBUG:
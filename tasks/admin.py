@@ -1,6 +1,9 @@
+import csv
+
 from django.contrib import admin
+from django.http import HttpResponse
 
-from .models import BiennialCropTask, CropTask
+from .models import ArchivedTaskGroup, BiennialCropTask, CropTask, TaskGroupCreation
 
 
 @admin.register(CropTask)
@@ -21,3 +24,62 @@ class BiennialCropTaskAdmin(admin.ModelAdmin):
 
     def has_add_permission(self, request):
         return False
+
+
+@admin.register(TaskGroupCreation)
+class TaskGroupCreationAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "status", "parent_task", "created_task_count", "expected_task_count", "updated_at"]
+    list_filter = ["status", "created_at"]
+    readonly_fields = [
+        "key",
+        "template",
+        "token_values",
+        "description",
+        "tasks",
+        "parent_task",
+        "created_nodes",
+        "expected_task_count",
+        "created_task_count",
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ArchivedTaskGroup)
+class ArchivedTaskGroupAdmin(admin.ModelAdmin):
+    list_display = ["title", "season", "template_title", "parent_task_type", "created_at", "archived_at"]
+    list_filter = ["season", "template_title"]
+    search_fields = ["search_text", "todo_id"]
+    actions = ["export_csv"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description="Export selected archived task groups as CSV")
+    def export_csv(self, request, queryset):
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="archived_task_groups.csv"'
+        writer = csv.writer(response)
+        writer.writerow(["season", "template", "title", "todo_id", "subtask", "completed", "start_date", "due_date"])
+        for archive in queryset.iterator():
+            for subtask in archive.subtasks or [{}]:
+                writer.writerow(
+                    [
+                        archive.season,
+                        archive.template_title,
+                        archive.title,
+                        archive.todo_id,
+                        subtask.get("title", ""),
+                        subtask.get("completed", ""),
+                        subtask.get("start_date") or "",
+                        subtask.get("due_date") or "",
+                    ]
+                )
+        return response
@@ -0,0 +1,212 @@
+"""
+Cross-season crop analytics rollup.
+
+``CropAnalytics`` holds one row per (season, crop, variety, bed, label) so the
+analytics view can slice seasons with indexed queries instead of joining the
+raw task history. Saving or deleting a crop task group, or one of its tasks,
+marks its cells dirty (the old and the new one when a group's key changed),
+and each dirty cell is recomputed once when the transaction commits. A task
+save costs one indexed lookup of its group's key, so a webhook delivery or a
+batch of new subtasks adds a single cell refresh. ``refresh_analytics``
+rebuilds the whole rollup; overdue counts depend on today's date, so run it
+nightly to keep them current.
+
+Cells are computed from both the hot task tables and ``ArchivedTaskGroup``,
+so archiving a season does not change its figures. A season is the year a
+task group was created. A task's labels come from the template task it was
+created from, matched by its rendered title.
+"""
+
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedTaskGroup, BiennialCropTask, CropAnalytics, CropTask
+from .tokens import render_title, split_labels
+
+SOW_LABEL = "sow"
+HARVEST_LABEL = "harvest"
+
+BATCH_SIZE = 500
+
+CROP_TASK_TYPES = [CropTask._meta.label_lower, BiennialCropTask._meta.label_lower]
+
+
+@dataclass
+class TaskRecord:
+    labels: list
+    completed: bool
+    start_date: date | None
+    due_date: date | None
+
+
+@dataclass
+class GroupRecord:
+    key: tuple
+    tasks: list = field(default_factory=list)
+
+
+def get_title_labels(template, token_values):
+    """Map each rendered template task title to its (lowercased) labels."""
+    title_labels = {}
+    for task in template.tasks or []:
+        for node in [task, *(task.get("subtasks") or [])]:
+            labels = [label.lower() for label in split_labels(node.get("labels"))]
+            title_labels[render_title(node.get("title", ""), token_values)] = labels
+    return title_labels
+
+
+def get_cell_key(group):
+    return (group.created_at.year, group.crop, group.variety_name, group.bed)
+
+
+def records_from_groups(groups):
+    """Group records for crop task groups with ``template`` and ``subtasks`` loaded."""
+    for group in groups:
+        title_labels = get_title_labels(group.template, group.get_token_values())
+        yield GroupRecord(
+            key=get_cell_key(group),
+            tasks=[
+                TaskRecord(title_labels.get(task.title, []), task.completed, task.start_date, task.due_date)
+                for task in group.subtasks.all()
+            ],
+        )
+
+
+def records_from_archives(archives):
+    """Group records for archived crop task groups; not every crop template has a crop or bed token."""
+    for archive in archives:
+        tokens = archive.token_values
+        yield GroupRecord(
+            key=(archive.season, tokens.get("crop", ""), tokens.get("variety_name", ""), tokens.get("bed", "")),
+            tasks=[
+                TaskRecord(
+                    task.get("labels", []),
+                    task.get("completed", False),
+                    date.fromisoformat(task["start_date"]) if task.get("start_date") else None,
+                    date.fromisoformat(task["due_date"]) if task.get("due_date") else None,
+                )
+                for task in archive.subtasks
+            ],
+        )
+
+
+def compute_rows(records, today=None):
+    """Roll group records up into unsaved ``CropAnalytics`` rows."""
+    today = today or timezone.localdate()
+    rows = {}
+
+    def get_row(key, label):
+        if (key, label) not in rows:
+            season, crop, variety_name, bed = key
+            rows[key, label] = CropAnalytics(season=season, crop=crop, variety_name=variety_name, bed=bed, label=label)
+        return rows[key, label]
+
+    for record in records:
+        label_dates = defaultdict(list)
+        group_labels = {""}
+
+        for task in record.tasks:
+            overdue = not task.completed and task.due_date is not None and task.due_date < today
+            for label in ["", *task.labels]:
+                row = get_row(record.key, label)
+                row.task_count += 1
+                row.completed_count += task.completed
+                row.overdue_count += overdue
+            group_labels.update(task.labels)
+            if task_date := task.due_date or task.start_date:
+                for label in task.labels:
+                    label_dates[label].append(task_date)
+
+        for label in group_labels:
+            get_row(record.key, label).group_count += 1
+
+        if label_dates[SOW_LABEL] and label_dates[HARVEST_LABEL]:
+            days = (min(label_dates[HARVEST_LABEL]) - min(label_dates[SOW_LABEL])).days
+            if days >= 0:
+                total = get_row(record.key, "")
+                total.sow_to_harvest_days += days
+                total.sow_to_harvest_count += 1
+
+    return list(rows.values())
+
+
+def _get_groups():
+    return CropTask.objects.select_related("template").prefetch_related("subtasks")
+
+
+def _get_archives():
+    return ArchivedTaskGroup.objects.filter(parent_task_type__in=CROP_TASK_TYPES)
+
+
+def refresh_cell(key):
+    """Recompute the rollup rows for one (season, crop, variety, bed) key."""
+    season, crop, variety_name, bed = key
+    groups = _get_groups().filter(created_at__year=season, crop=crop, variety_name=variety_name, bed=bed)
+    archives = _get_archives().filter(season=season, token_values__variety_name=variety_name)
+    records = [
+        *records_from_groups(groups),
+        *(record for record in records_from_archives(archives) if record.key == key),
+    ]
+    rows = compute_rows(records)
+    with transaction.atomic():
+        CropAnalytics.objects.filter(season=season, crop=crop, variety_name=variety_name, bed=bed).delete()
+        CropAnalytics.objects.bulk_create(rows)
+
+
+def rebuild(season=None):
+    """Recompute the whole rollup, or one season of it. Returns the number of rows written."""
+    groups = _get_groups().order_by("pk")
+    archives = _get_archives().order_by("pk")
+    existing = CropAnalytics.objects.all()
+    if season is not None:
+        groups = groups.filter(created_at__year=season)
+        archives = archives.filter(season=season)
+        existing = existing.filter(season=season)
+
+    records = [
+        *records_from_groups(groups.iterator(chunk_size=BATCH_SIZE)),
+        *records_from_archives(archives.iterator(chunk_size=BATCH_SIZE)),
+    ]
+    rows = compute_rows(records)
+    with transaction.atomic():
+        existing.delete()
+        CropAnalytics.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+# Cell keys waiting for the current transaction to commit, per thread
+_dirty = threading.local()
+
+
+def get_saved_cell_key(group):
+    """The group's cell key as loaded from the database, or None if it isn't saved or fully loaded."""
+    values = [group.__dict__.get(name) for name in ("created_at", "crop", "variety_name", "bed")]
+    if any(value is None for value in values):
+        return None
+    return (values[0].year, *values[1:])
+
+
+def get_group_cell_key(group_id):
+    """The cell key of crop task group ``group_id``, or None if the group isn't a crop task group."""
+    values = CropTask.objects.filter(pk=group_id).values_list("created_at", "crop", "variety_name", "bed").first()
+    return (values[0].year, *values[1:]) if values else None
+
+
+def _refresh_dirty_cells():
+    keys, _dirty.keys = getattr(_dirty, "keys", set()), set()
+    for key in keys:
+        refresh_cell(key)
+
+
+def mark_dirty(*keys):
+    """Recompute the cells for ``keys`` once the current transaction commits, each cell once."""
+    if not hasattr(_dirty, "keys"):
+        _dirty.keys = set()
+    _dirty.keys.update(key for key in keys if key is not None)
+    # Every call registers a flush, so keys left by a rolled back transaction go out with the next commit
+    transaction.on_commit(_refresh_dirty_cells)
@@ -0,0 +1,116 @@
+"""
+Season archival.
+
+Completed task groups from closed seasons are copied into compact
+``ArchivedTaskGroup`` rows and removed from the ``Task`` / parent task tables,
+so the dashboard, template pages and admin changelists only scan the active
+working set. A season is the year a task group was created.
+"""
+
+import gzip
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from todosync.models import BaseParentTask, BaseTaskGroupTemplate, Task
+
+from .analytics import get_title_labels
+from .models import ArchivedTaskGroup
+
+BATCH_SIZE = 500
+
+
+def get_current_season():
+    return timezone.now().year
+
+
+def get_archivable_groups(template, season):
+    """
+    Groups from ``template`` created in ``season`` whose subtasks are all completed.
+
+    Groups without subtasks, such as a creation that stopped after the parent
+    task, are not finished and are never archived.
+    """
+    parent_task_model = template.get_parent_task_model() or BaseParentTask
+    return (
+        parent_task_model.objects.filter(template=template, created_at__year=season, subtasks__isnull=False)
+        .exclude(subtasks__completed=False)
+        .distinct()
+        .prefetch_related("subtasks")
+        .order_by("pk")
+    )
+
+
+def build_archive(group, template, season):
+    token_values = group.get_token_values()
+    title = group.get_parent_task_title()
+    title_labels = get_title_labels(template, token_values)
+    subtasks = [
+        {
+            "title": subtask.title,
+            "todo_id": subtask.todo_id,
+            "completed": subtask.completed,
+            "start_date": subtask.start_date.isoformat() if subtask.start_date else None,
+            "due_date": subtask.due_date.isoformat() if subtask.due_date else None,
+            "labels": title_labels.get(subtask.title, []),
+        }
+        for subtask in group.subtasks.all()
+    ]
+    return ArchivedTaskGroup(
+        season=season,
+        template_title=template.title,
+        parent_task_type=group._meta.label_lower,
+        title=title,
+        todo_id=group.todo_id,
+        token_values=token_values,
+        subtasks=subtasks,
+        search_text=" ".join([title, *(str(value) for value in token_values.values())]).lower(),
+        created_at=group.created_at,
+    )
+
+
+def archive_season(season, dry_run=False):
+    """
+    Move completed groups created in ``season`` into the archive table.
+
+    Returns the number of groups archived (or that would be, for a dry run).
+    """
+    if season >= get_current_season():
+        raise ValueError(f"Season {season} is not closed yet")
+
+    archived = 0
+    for template in BaseTaskGroupTemplate.objects.all():
+        groups = list(get_archivable_groups(template, season))
+        archived += len(groups)
+        if dry_run:
+            continue
+        for start in range(0, len(groups), BATCH_SIZE):
+            batch = groups[start : start + BATCH_SIZE]
+            with transaction.atomic():
+                ArchivedTaskGroup.objects.bulk_create([build_archive(group, template, season) for group in batch])
+                subtask_ids = [subtask.pk for group in batch for subtask in group.subtasks.all()]
+                Task.objects.filter(pk__in=subtask_ids).delete()
+                BaseParentTask.objects.filter(pk__in=[group.pk for group in batch]).delete()
+    return archived
+
+
+def export_season(season, path):
+    """Write a season's archived groups to a gzipped JSON Lines file. Returns the number written."""
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for archive in ArchivedTaskGroup.objects.filter(season=season).order_by("pk").iterator():
+            record = {
+                "season": archive.season,
+                "template": archive.template_title,
+                "type": archive.parent_task_type,
+                "title": archive.title,
+                "todo_id": archive.todo_id,
+                "token_values": archive.token_values,
+                "subtasks": archive.subtasks,
+                "created_at": archive.created_at,
+            }
+            f.write(json.dumps(record, cls=DjangoJSONEncoder) + "\n")
+            count += 1
+    return count
@@ -0,0 +1,231 @@
+"""
+Task group creation through the Todoist Sync API.
+
+A group's task tree is sent as ``item_add`` commands, up to
+``COMMAND_BATCH_SIZE`` per request, so a season of groups takes a handful of
+requests rather than one per task. Each command's UUID is derived from the
+group's key and the task's position in the template (its node path), and
+Todoist does not run a command UUID twice, so sending a batch again cannot
+duplicate tasks.
+
+The Todoist id of every created node is recorded in ``GroupRequest.created_nodes``
+and only missing nodes are sent, so a group that stopped part way can be
+resumed. The parent task and one ``Task`` row per node are saved locally
+after each batch.
+
+Scheduled dates on template tasks (see ``tasks.scheduling``) are sent
+explicitly: ``start_date`` becomes the Todoist due date and ``due_date`` the
+deadline. A task with only a ``due_date`` gets it as its due date.
+"""
+
+import json
+import uuid
+from dataclasses import dataclass, field
+from datetime import date
+
+import requests
+from django.conf import settings
+from django.db import transaction
+
+from todosync.models import BaseParentTask
+
+from .tokens import render_title, split_labels
+
+SYNC_URL = "https://api.todoist.com/api/v1/sync"
+
+# Todoist accepts at most 100 commands per sync request
+COMMAND_BATCH_SIZE = 100
+
+PARENT_PATH = "parent"
+
+UUID_NAMESPACE = uuid.UUID("6f1d3c2e-8a47-4b5e-9c1a-2d7e4f0b9a61")
+
+
+class TodoistSyncClient:
+    def __init__(self, token, session=None):
+        self.token = token
+        self.session = session or requests.Session()
+
+    def run(self, commands):
+        """Send commands to the Sync API; returns ``(sync_status, temp_id_mapping)``."""
+        response = self.session.post(
+            SYNC_URL,
+            headers={"Authorization": f"Bearer {self.token}"},
+            data={"commands": json.dumps(commands)},
+            timeout=30,
+        )
+        response.raise_for_status()
+        result = response.json()
+        return result.get("sync_status", {}), result.get("temp_id_mapping", {})
+
+
+def get_sync_client():
+    return TodoistSyncClient(settings.TODOIST_API_TOKEN)
+
+
+def iter_nodes(tasks):
+    """Yield ``(path, parent_path, node)`` for every task and subtask of a template tree."""
+    for index, task in enumerate(tasks or []):
+        yield str(index), PARENT_PATH, task
+        for sub_index, subtask in enumerate(task.get("subtasks") or []):
+            yield f"{index}.{sub_index}", str(index), subtask
+
+
+def count_nodes(tasks):
+    """Number of Todoist tasks a template creates below the parent task."""
+    return sum(1 for _ in iter_nodes(tasks))
+
+
+def _parse_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+@dataclass(eq=False)
+class GroupRequest:
+    """One task group to create, or to finish creating."""
+
+    template: object
+    token_values: dict
+    key: str
+    tasks: list | None = None
+    description: str = ""
+    created_nodes: dict = field(default_factory=dict)
+    parent_task: object = None
+    errors: list = field(default_factory=list)
+
+    def __post_init__(self):
+        if self.tasks is None:
+            self.tasks = self.template.tasks or []
+
+    @property
+    def expected_count(self):
+        return count_nodes(self.tasks)
+
+    @property
+    def created_count(self):
+        return len([path for path in self.created_nodes if path != PARENT_PATH])
+
+    @property
+    def is_complete(self):
+        return PARENT_PATH in self.created_nodes and self.created_count == self.expected_count
+
+    def command_uuid(self, path):
+        return str(uuid.uuid5(UUID_NAMESPACE, f"{self.key}:{path}"))
+
+    def temp_id(self, path):
+        return str(uuid.uuid5(UUID_NAMESPACE, f"{self.key}:{path}:temp"))
+
+    def parent_args(self):
+        parent_task_model = self.template.get_parent_task_model()
+        parent = parent_task_model(**self.token_values) if parent_task_model else None
+        description = "\n\n".join(
+            part
+            for part in [
+                parent.get_description() if parent else "",
+                render_title(self.template.description or "", self.token_values),
+                render_title(self.description or "", self.token_values),
+            ]
+            if part
+        )
+        args = {"content": parent.get_parent_task_title() if parent else self.template.title}
+        if description:
+            args["description"] = description
+        if project_id := self.template.get_effective_project_id():
+            args["project_id"] = project_id
+        return args
+
+    def node_args(self, node):
+        args = {"content": render_title(node.get("title", ""), self.token_values)}
+        if labels := split_labels(node.get("labels")):
+            args["labels"] = labels
+        start_date, due_date = node.get("start_date"), node.get("due_date")
+        if start_date:
+            args["due"] = {"date": start_date}
+            if due_date:
+                args["deadline"] = {"date": due_date}
+        elif due_date:
+            args["due"] = {"date": due_date}
+        return args
+
+
+def _next_batch(groups):
+    """Commands for missing nodes whose parent already exists or is added earlier in the same batch."""
+    batch = []
+    for group in groups:
+        if group.errors:
+            continue
+        queued = set()
+        nodes = [(PARENT_PATH, None, None), *iter_nodes(group.tasks)]
+        for path, parent_path, node in nodes:
+            if len(batch) >= COMMAND_BATCH_SIZE:
+                return batch
+            if path in group.created_nodes:
+                continue
+            if path == PARENT_PATH:
+                args = group.parent_args()
+            elif parent_path in group.created_nodes:
+                args = {**group.node_args(node), "parent_id": group.created_nodes[parent_path]}
+            elif parent_path in queued:
+                args = {**group.node_args(node), "parent_id": group.temp_id(parent_path)}
+            else:
+                continue
+            batch.append(
+                (
+                    group,
+                    path,
+                    node,
+                    {
+                        "type": "item_add",
+                        "uuid": group.command_uuid(path),
+                        "temp_id": group.temp_id(path),
+                        "args": args,
+                    },
+                )
+            )
+            queued.add(path)
+    return batch
+
+
+def _save_created(group, path, node, todo_id):
+    group.created_nodes[path] = todo_id
+    if path == PARENT_PATH:
+        parent_task_model = group.template.get_parent_task_model() or BaseParentTask
+        group.parent_task = parent_task_model.objects.create(
+            template=group.template, todo_id=todo_id, **group.token_values
+        )
+    else:
+        group.parent_task.subtasks.create(
+            title=render_title(node.get("title", ""), group.token_values),
+            todo_id=todo_id,
+            start_date=_parse_date(node.get("start_date")),
+            due_date=_parse_date(node.get("due_date")),
+        )
+
+
+def create_groups(client, groups, on_batch=None):
+    """
+    Create the missing tasks of every group, batching commands across groups.
+
+    A group stops at its first rejected command (recorded in ``errors``), and
+    nodes below a missing parent are left for a later resume. ``on_batch`` is
+    called with the groups touched by each batch, inside the transaction that
+    saves their local rows. Returns the number of Todoist tasks created.
+    """
+    created = 0
+    while batch := _next_batch(groups):
+        sync_status, temp_id_mapping = client.run([command for *_, command in batch])
+        touched = []
+        with transaction.atomic():
+            for group, path, node, command in batch:
+                status = sync_status.get(command["uuid"])
+                todo_id = temp_id_mapping.get(command["temp_id"])
+                if status != "ok" or not todo_id:
+                    group.errors.append({"path": path, "error": status or "missing from the sync response"})
+                    continue
+                _save_created(group, path, node, str(todo_id))
+                created += 1
+                if group not in touched:
+                    touched.append(group)
+            if on_batch and touched:
+                on_batch(touched)
+    return created
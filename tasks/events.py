@@ -0,0 +1,59 @@
+"""
+In-process event broker for the server-sent events stream.
+
+Model signals publish task-creation and completion changes from whichever
+thread saved them; each connected ``/events/`` client holds an asyncio queue
+on the ASGI event loop. Events only reach clients connected to the same
+process, so run the ASGI app as a single worker.
+"""
+
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Per-client backlog; a client that falls this far behind starts missing events
+QUEUE_SIZE = 100
+
+
+class EventBroker:
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event, data):
+        """Send an event to every connected client. Safe to call from any thread."""
+        message = f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, message)
+            except RuntimeError:
+                # The client's event loop has already closed
+                pass
+
+    @staticmethod
+    def _put(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+    @contextmanager
+    def subscribe(self):
+        """Register the running event loop as a client and yield its message queue."""
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+
+broker = EventBroker()
@@ -0,0 +1,159 @@
+from django import forms
+from django_jsonform.forms.fields import JSONFormField
+
+from todosync.forms import BaseTaskGroupCreationForm
+from todosync.models import BaseTaskGroupTemplate
+
+from .idempotency import issue_form_nonce, read_form_nonce
+from .models import CropTaskGroupTemplate
+from .schemas import CROP_TASKS_SCHEMA
+from .todoist_mirror import (
+    get_default_project_name,
+    get_known_labels,
+    get_project_choices,
+    get_sync_warning,
+    normalise_labels,
+)
+from .tokens import split_labels
+from .versions import bump_version, get_version
+
+
+class TaskGroupTemplateForm(forms.ModelForm):
+    """
+    Template edit form whose task editor also exposes relative-date offsets.
+
+    Projects and labels come from the local Todoist mirror, so rendering and
+    validating the form never calls the Todoist API.
+    """
+
+    project_id = forms.ChoiceField(label="Project", required=False)
+    tasks = JSONFormField(schema=CROP_TASKS_SCHEMA, required=False)
+
+    class Meta:
+        model = CropTaskGroupTemplate
+        fields = ["title", "description", "project_id", "tasks"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        current = self.initial.get("project_id", "")
+        self.fields["project_id"].choices = [
+            ("", f"Default ({get_default_project_name()})"),
+            *get_project_choices(current),
+        ]
+        self.fields["project_id"].help_text = get_sync_warning()
+
+    def clean_tasks(self):
+        tasks = self.cleaned_data.get("tasks") or []
+        known_labels = get_known_labels()
+        for task in tasks:
+            for node in [task, *(task.get("subtasks") or [])]:
+                if node.get("labels"):
+                    node["labels"] = normalise_labels(node["labels"], known_labels)
+        return tasks
+
+
+class CachedTaskGroupCreationForm(BaseTaskGroupCreationForm):
+    """
+    Creation form with the token fields of one template declared up front.
+
+    Subclasses are generated once per template version by
+    ``get_task_group_form_class``, so rendering and validating the form skips
+    the template lookup and model field introspection.
+    """
+
+    _template = None
+    _token_field_names = []
+    task_preview = []
+
+    def __init__(self, *args, **kwargs):
+        # The token fields are already declared, so the base form is built without a template
+        super().__init__(*args, **kwargs)
+        if self._template is not None:
+            self.fields["task_group_template"].initial = self._template
+            # Each render gets its own nonce, so separate tabs make separate creations
+            self.fields["form_nonce"] = forms.CharField(
+                widget=forms.HiddenInput, initial=issue_form_nonce(self._template.pk)
+            )
+
+    def clean_form_nonce(self):
+        nonce = read_form_nonce(self.cleaned_data["form_nonce"], self._template.pk)
+        if nonce is None:
+            raise forms.ValidationError("This form is no longer valid. Load it again and resubmit.")
+        return nonce
+
+    def get_token_values(self):
+        if not hasattr(self, "cleaned_data"):
+            return {}
+        return {name: self.cleaned_data.get(f"token_{name}", "") for name in self._token_field_names}
+
+
+# template id -> (version, form class), for this process
+_form_classes = {}
+
+
+def _version_key(template_id):
+    return f"tasks:template-version:{template_id}"
+
+
+def get_template_version(template_id):
+    return get_version(_version_key(template_id))
+
+
+def invalidate_template_forms(template_id):
+    """Give the template a new version so every process rebuilds its cached form class."""
+    bump_version(_version_key(template_id))
+    _form_classes.pop(template_id, None)
+
+
+def build_task_preview(tasks):
+    """Task tree with labels split into lists, as shown above the creation form."""
+    return [
+        {
+            "title": task.get("title", ""),
+            "labels": split_labels(task.get("labels")),
+            "subtasks": build_task_preview(task.get("subtasks")),
+        }
+        for task in tasks or []
+    ]
+
+
+def build_task_group_form_class(template):
+    parent_task_model = template.get_parent_task_model()
+    token_field_names = template.get_token_field_names() if parent_task_model else []
+    attrs = {
+        "_template": template,
+        "_token_field_names": token_field_names,
+        "task_preview": build_task_preview(template.tasks),
+    }
+    for name in token_field_names:
+        model_field = parent_task_model._meta.get_field(name)
+        attrs[f"token_{name}"] = forms.CharField(
+            label=name.replace("_", " ").title(),
+            required=not model_field.blank,
+        )
+    return type(f"TaskGroupCreationForm{template.pk}", (CachedTaskGroupCreationForm,), attrs)
+
+
+def get_task_group_form_class(template_id):
+    """Return the creation form class for a template, building it only when the template has changed."""
+    try:
+        template_id = int(template_id)
+    except (TypeError, ValueError):
+        return CachedTaskGroupCreationForm
+
+    version = get_template_version(template_id)
+    cached = _form_classes.get(template_id)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    template = BaseTaskGroupTemplate.objects.filter(pk=template_id).first()
+    if template is None:
+        return CachedTaskGroupCreationForm
+    form_class = build_task_group_form_class(template)
+    _form_classes[template_id] = (version, form_class)
+    return form_class
+
+
+def task_group_creation_form(*args, template_id=None, **kwargs):
+    """Drop-in replacement for ``BaseTaskGroupCreationForm(...)`` that uses the cached class."""
+    return get_task_group_form_class(template_id)(*args, **kwargs)
@@ -0,0 +1,42 @@
+"""
+Idempotency keys for task group creation.
+
+Each render of the create form carries a new nonce in a signed hidden field.
+A submission's key is derived from the template, token values, description
+and that nonce, so double submits and browser or proxy retries of the same
+form map to the same ``TaskGroupCreation`` and never reach Todoist twice,
+while loading the form again, in the same tab or another one, starts a new
+creation.
+"""
+
+import hashlib
+import json
+import secrets
+
+from django.core import signing
+
+NONCE_SALT = "tasks.idempotency.form-nonce"
+
+
+def issue_form_nonce(template_id):
+    """A signed nonce for one render of the create form for ``template_id``."""
+    return signing.dumps({"template": str(template_id), "nonce": secrets.token_urlsafe(16)}, salt=NONCE_SALT)
+
+
+def read_form_nonce(value, template_id):
+    """The nonce in a signed ``value``, or None if it is forged or was issued for another template."""
+    try:
+        data = signing.loads(value, salt=NONCE_SALT)
+    except signing.BadSignature:
+        return None
+    if data.get("template") != str(template_id):
+        return None
+    return data.get("nonce")
+
+
+def make_idempotency_key(template_id, token_values, description, nonce):
+    payload = json.dumps(
+        {"template": template_id, "tokens": token_values, "description": description, "nonce": nonce},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
@@ -0,0 +1,132 @@
+"""
+Cached label action rules for the Todoist webhook.
+
+todosync's webhook view reads the label action rules through
+``TaskSyncSettings.load().label_action_rules``, which loads the settings and
+every rule from the database for each delivery. ``tasks.views.webhook`` wraps
+that view: while it runs, ``TaskSyncSettings.load()`` returns a copy of a
+settings instance kept per process with its rules prefetched, so reading them
+costs no queries. The cached instance is reloaded when its version token
+changes, which the signals in ``tasks.signals`` do whenever a rule or the
+settings are saved or deleted. ``load()`` is only replaced while a wrapped
+view is running, and is restored when the last one in the process returns;
+code in other threads calling it meanwhile gets the usual fresh settings.
+"""
+
+import copy
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.db.models import prefetch_related_objects
+from django.urls import resolve
+
+from todosync.models import TaskSyncSettings
+
+from .versions import bump_version, get_version
+
+VERSION_KEY = "tasks:label-rules-version"
+
+RULES_ATTR = "label_action_rules"
+
+
+@dataclass
+class CachedRules:
+    """
+    The settings with their rules prefetched, as loaded at ``version``.
+
+    This saves the queries only: todosync still matches each event by
+    scanning every rule, as it does without the cache.
+    """
+
+    version: str
+    settings: TaskSyncSettings
+
+    @property
+    def rules(self):
+        return list(getattr(self.settings, RULES_ATTR).all())
+
+    def get_settings(self):
+        """A copy of the cached settings, so changes made while handling one event don't leak into the next."""
+        settings = copy.copy(self.settings)
+        settings._prefetched_objects_cache = dict(self.settings._prefetched_objects_cache)
+        return settings
+
+
+def get_rules_version():
+    return get_version(VERSION_KEY)
+
+
+def invalidate_cached_rules():
+    """Give the rules a new version so every process reloads them on the next event."""
+    bump_version(VERSION_KEY)
+
+
+# The settings served to the webhook view that is running in this context, if any
+_serving = ContextVar("label_rules_serving", default=None)
+# ``load`` as todosync defines it, restored once no webhook view is running
+_original_descriptor = TaskSyncSettings.__dict__.get("load")
+_original_load = TaskSyncSettings.load
+_active = 0
+_install_lock = threading.Lock()
+
+
+def _serving_load(cls):
+    return _serving.get() or _original_load()
+
+
+def _install():
+    """Route ``TaskSyncSettings.load()`` through the cache while any ``serve_cached_rules`` block runs."""
+    global _active
+    with _install_lock:
+        _active += 1
+        if _active == 1:
+            TaskSyncSettings.load = classmethod(_serving_load)
+
+
+def _uninstall():
+    global _active
+    with _install_lock:
+        _active -= 1
+        if _active:
+            return
+        if _original_descriptor is None:
+            del TaskSyncSettings.load
+        else:
+            TaskSyncSettings.load = _original_descriptor
+
+
+def _load_settings():
+    return _original_load()
+
+
+# The cached rules for this process, replaced when the version changes
+_cached = None
+
+
+def get_cached_rules():
+    global _cached
+    version = get_rules_version()
+    cached = _cached
+    if cached is None or cached.version != version:
+        settings = _load_settings()
+        prefetch_related_objects([settings], RULES_ATTR)
+        cached = _cached = CachedRules(version=version, settings=settings)
+    return cached
+
+
+@contextmanager
+def serve_cached_rules():
+    """Have ``TaskSyncSettings.load()`` return the cached settings and rules inside the block."""
+    token = _serving.set(get_cached_rules().get_settings())
+    _install()
+    try:
+        yield
+    finally:
+        _uninstall()
+        _serving.reset(token)
+
+
+def get_todosync_webhook():
+    return resolve("/webhook/", urlconf="todosync.urls").func
@@ -0,0 +1,325 @@
+"""
+Webhook load-test harness.
+
+Replays signed Todoist webhook payloads against the app at a fixed rate and
+concurrency, with outgoing Todoist API calls answered by a local stub, and
+summarises latency, errors and SQLite lock contention. See the
+``loadtest_webhook`` management command. ``benchmark_view`` posts payloads
+straight to a view instead, for ``benchmark_label_rules``.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+from django.core.signals import got_request_exception
+from django.db import OperationalError, connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from todosync.models import LabelActionRule, Task, TaskSyncSettings
+
+TODOIST_API_BASE = "https://api.todoist.com"
+
+# Relative frequency of webhook events, roughly as seen from a working allotment week
+EVENT_WEIGHTS = {
+    "item:updated": 6,
+    "item:completed": 3,
+    "item:uncompleted": 1,
+}
+
+
+@dataclass
+class LoadTestResult:
+    requests: int = 0
+    errors: int = 0
+    lock_errors: int = 0
+    stub_calls: int = 0
+    duration: float = 0.0
+    latencies: list = field(default_factory=list)
+
+    @property
+    def error_rate(self):
+        return self.errors / self.requests if self.requests else 0.0
+
+    @property
+    def throughput(self):
+        return self.requests / self.duration if self.duration else 0.0
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 4),
+            "lock_errors": self.lock_errors,
+            "stub_calls": self.stub_calls,
+            "throughput": round(self.throughput, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def sign_payload(body, secret):
+    """Return the ``X-Todoist-Hmac-SHA256`` header value for a webhook body."""
+    digest = hmac.new(secret.encode(), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode()
+
+
+def build_payloads(count, seed=0):
+    """
+    Model webhook payloads on the tasks stored locally.
+
+    The same ``seed`` and database contents always give the same sequence, so
+    runs can be compared before and after a change to the webhook path.
+    """
+    rng = random.Random(seed)
+    tasks = list(Task.objects.order_by("pk").values_list("todo_id", "title", "completed"))
+    if not tasks:
+        tasks = [(str(9_000_000_000 + index), f"Load test task {index}", False) for index in range(100)]
+    events = list(EVENT_WEIGHTS)
+    weights = list(EVENT_WEIGHTS.values())
+
+    payloads = []
+    for _ in range(count):
+        todo_id, title, completed = rng.choice(tasks)
+        event_name = rng.choices(events, weights)[0]
+        payloads.append(
+            {
+                "event_name": event_name,
+                "user_id": "1",
+                "version": "10",
+                "initiator": {"id": "1", "full_name": "Load Test"},
+                "event_data": {
+                    "id": str(todo_id),
+                    "content": title,
+                    "checked": event_name == "item:completed" or (event_name == "item:updated" and completed),
+                    "labels": [],
+                },
+            }
+        )
+    return payloads
+
+
+def load_recorded_payloads(path):
+    """Read recorded webhook bodies, one JSON object per line."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class TodoistStub:
+    """Local stand-in for the Todoist REST API that accepts every call."""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                with stub._lock:
+                    stub.calls += 1
+                body = json.dumps({"id": "1", "results": [], "next_cursor": None}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_DELETE = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@contextmanager
+def redirect_todoist_api(base_url):
+    """Send in-process ``requests`` calls aimed at Todoist to ``base_url`` instead."""
+    original = requests.Session.request
+
+    def request(session, method, url, *args, **kwargs):
+        if url.startswith(TODOIST_API_BASE):
+            url = base_url + url[len(TODOIST_API_BASE) :]
+        return original(session, method, url, *args, **kwargs)
+
+    requests.Session.request = request
+    try:
+        yield
+    finally:
+        requests.Session.request = original
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_wsgi(application):
+    """Serve a WSGI application on a free local port for the duration of the block."""
+    server = make_server("127.0.0.1", 0, application, server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def count_lock_errors(result):
+    """Count requests that failed in-process with SQLite's ``database is locked``."""
+    lock = threading.Lock()
+
+    def on_exception(sender, request=None, **kwargs):
+        exc = sys.exc_info()[1]
+        if isinstance(exc, OperationalError) and "locked" in str(exc):
+            with lock:
+                result.lock_errors += 1
+
+    got_request_exception.connect(on_exception, weak=False)
+    try:
+        yield
+    finally:
+        got_request_exception.disconnect(on_exception)
+
+
+def run(url, payloads, secret, rate, concurrency, result=None):
+    """
+    Post every payload to ``url`` at ``rate`` requests per second.
+
+    Requests are scheduled open-loop, so a slow server builds up a queue
+    instead of silently lowering the offered load.
+    """
+    result = result or LoadTestResult()
+    lock = threading.Lock()
+
+    def send(payload, scheduled):
+        body = json.dumps(payload).encode()
+        request = urllib.request.Request(
+            url,
+            data=body,
+            method="POST",
+            headers={"Content-Type": "application/json", "X-Todoist-Hmac-SHA256": sign_payload(body, secret)},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                failed = response.status >= 400
+        except (urllib.error.URLError, TimeoutError):
+            failed = True
+        # Measured from the scheduled send time so queueing delay counts towards latency
+        elapsed = time.perf_counter() - scheduled
+        with lock:
+            result.requests += 1
+            result.errors += int(failed)
+            result.latencies.append(elapsed)
+
+    interval = 1 / rate
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for index, payload in enumerate(payloads):
+            scheduled = started + index * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, payload, scheduled)
+    result.duration = time.perf_counter() - started
+    return result
+
+
+def count_rule_queries(queries):
+    """Captured queries that read or write the settings or label action rule tables."""
+    tables = [f'"{model._meta.db_table}"' for model in (LabelActionRule, TaskSyncSettings)]
+    return sum(1 for query in queries if any(table in query["sql"] for table in tables))
+
+
+def benchmark_view(view, payloads, secret, path="/todosync/webhook/"):
+    """
+    Post each signed payload straight to ``view``, in-process.
+
+    Returns requests per second, errors, and queries per request in total and
+    against the settings and rule tables.
+    """
+    factory = RequestFactory()
+    bodies = [json.dumps(payload).encode() for payload in payloads]
+    errors = 0
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for body in bodies:
+            request = factory.post(
+                path, data=body, content_type="application/json", HTTP_X_TODOIST_HMAC_SHA256=sign_payload(body, secret)
+            )
+            errors += view(request).status_code >= 400
+        elapsed = time.perf_counter() - started
+    count = len(bodies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "requests_per_second": round(count / elapsed, 1) if elapsed else None,
+        "queries_per_request": round(len(queries) / count, 2) if count else 0,
+        "rule_queries_per_request": round(count_rule_queries(queries.captured_queries) / count, 2) if count else 0,
+    }
+
+
+def compare(summary, baseline):
+    """Return ``(metric, baseline, current, change)`` rows for two run summaries."""
+    rows = []
+    for key, value in summary.items():
+        previous = baseline.get(key)
+        if isinstance(previous, int | float) and previous:
+            change = f"{(value - previous) / previous:+.1%}"
+        else:
+            change = ""
+        rows.append((key, previous, value, change))
+    return rows
+
+
+def write_summary(path, summary, options):
+    with open(path, "w") as f:
+        json.dump({"summary": summary, "options": options}, f, indent=2)
+
+
+def read_summary(path):
+    with open(path) as f:
+        return json.load(f)["summary"]
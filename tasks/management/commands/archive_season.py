@@ -0,0 +1,26 @@
+import djclick as click
+
+from tasks.archive import archive_season, export_season
+
+
+@click.command()
+@click.argument("season", type=int)
+@click.option("--dry-run", is_flag=True, help="Report how many groups would be archived without moving them")
+@click.option(
+    "--export", "export_path", type=click.Path(dir_okay=False), help="Also write the season to a .jsonl.gz file"
+)
+def command(season, dry_run, export_path):
+    """Move completed task groups from a closed SEASON (year) into the archive tables."""
+    try:
+        count = archive_season(season, dry_run=dry_run)
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
+
+    if dry_run:
+        click.secho(f"{count} task groups from {season} would be archived", fg="cyan")
+    else:
+        click.secho(f"Archived {count} task groups from {season}", fg="green")
+
+    if export_path:
+        exported = export_season(season, export_path)
+        click.secho(f"Exported {exported} archived task groups to {export_path}", fg="green")
@@ -0,0 +1,50 @@
+"""
+Benchmark the Todoist webhook with and without the cached label action rules.
+
+Signed payloads modelled on the stored tasks are posted straight to todosync's
+webhook view and then to ``tasks.views.webhook``, with Todoist API calls sent
+to a local stub. Each run is rolled back, so both start from the same data.
+"""
+
+import os
+
+import djclick as click
+from django.conf import settings
+from django.db import transaction
+from rich.console import Console
+from rich.table import Table
+
+from tasks import label_rules, loadtest
+from tasks.views import webhook
+
+
+@click.command()
+@click.option("--requests", "count", type=int, default=500, show_default=True, help="Number of webhook events")
+@click.option("--seed", type=int, default=0, show_default=True, help="Seed for the payload sequence")
+@click.option("--secret", help="Webhook signing secret (defaults to TODOIST_WEBHOOK_SECRET / TODOIST_CLIENT_SECRET)")
+def command(count, seed, secret):
+    """Compare the webhook's queries and throughput before and after caching the label action rules."""
+    console = Console()
+    secret = secret or os.getenv("TODOIST_WEBHOOK_SECRET") or settings.TODOIST_CLIENT_SECRET
+    payloads = loadtest.build_payloads(count, seed=seed)
+    console.print(f"Posting {len(payloads)} events with {len(label_rules.get_cached_rules().rules)} label action rules")
+
+    results = {}
+    with loadtest.TodoistStub() as stub, loadtest.redirect_todoist_api(stub.base_url):
+        for name, view in [("todosync webhook", label_rules.get_todosync_webhook()), ("Cached rules", webhook)]:
+            with transaction.atomic():
+                results[name] = loadtest.benchmark_view(view, payloads, secret)
+                transaction.set_rollback(True)
+
+    table = Table(title="Webhook label action rules")
+    for column in ("View", "Requests/s", "Queries/request", "Rule queries/request", "Errors"):
+        table.add_column(column, justify="right")
+    for name, result in results.items():
+        table.add_row(
+            name,
+            str(result["requests_per_second"]),
+            str(result["queries_per_request"]),
+            str(result["rule_queries_per_request"]),
+            str(result["errors"]),
+        )
+    console.print(table)
@@ -0,0 +1,101 @@
+"""
+Load-test the Todoist webhook endpoint.
+
+By default the app is served in-process through its WSGI entry point with
+Todoist API calls sent to a local stub, against a temporary copy of the SQLite
+database so the replayed completions and updates don't change real tasks.
+``--live-db`` runs against the configured database instead. Pass ``--target``
+to hit a separately running server (e.g. the ASGI app under uvicorn); that
+server writes to its own database, so ``--live-db`` is required, and the stub
+and lock-error counting are not available.
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import djclick as click
+from django.conf import settings
+from django.db import connections
+from rich.console import Console
+from rich.table import Table
+
+from tasks import loadtest
+
+
+def _use_scratch_database():
+    """Point the default SQLite connection at a throwaway copy so repeated runs start from the same data."""
+    database = connections["default"].settings_dict
+    if database["ENGINE"] != "django.db.backends.sqlite3":
+        raise click.ClickException("The scratch database copy only supports SQLite; pass --live-db to run anyway")
+    scratch = Path(tempfile.mkdtemp()) / "loadtest.sqlite3"
+    shutil.copyfile(database["NAME"], scratch)
+    connections.close_all()
+    database["NAME"] = str(scratch)
+    return scratch
+
+
+@click.command()
+@click.option("--requests", "count", type=int, default=500, show_default=True, help="Number of webhook events")
+@click.option("--rate", type=float, default=20.0, show_default=True, help="Requests per second")
+@click.option("--concurrency", type=int, default=4, show_default=True, help="Concurrent connections")
+@click.option("--seed", type=int, default=0, show_default=True, help="Seed for the payload sequence")
+@click.option("--path", default="/todosync/webhook/", show_default=True, help="Webhook URL path")
+@click.option("--target", help="Base URL of an already running server, instead of serving in-process")
+@click.option("--secret", help="Webhook signing secret (defaults to TODOIST_WEBHOOK_SECRET / TODOIST_CLIENT_SECRET)")
+@click.option("--payloads", "payloads_path", type=click.Path(exists=True), help="Replay recorded payloads (JSONL)")
+@click.option("--live-db", is_flag=True, help="Send events at the configured database instead of a temporary copy")
+@click.option("--output", type=click.Path(), help="Write the run summary to this JSON file")
+@click.option("--compare", "baseline_path", type=click.Path(exists=True), help="Compare with a saved summary")
+def command(count, rate, concurrency, seed, path, target, secret, payloads_path, live_db, output, baseline_path):
+    """Replay signed webhook payloads and report latency, errors and lock contention."""
+    console = Console()
+    secret = secret or os.getenv("TODOIST_WEBHOOK_SECRET") or settings.TODOIST_CLIENT_SECRET
+
+    if target and not live_db:
+        raise click.ClickException("--target sends events to that server's own database; pass --live-db to confirm")
+    if not live_db:
+        console.print(f"Using scratch database {_use_scratch_database()}")
+
+    if payloads_path:
+        payloads = loadtest.load_recorded_payloads(payloads_path)
+    else:
+        payloads = loadtest.build_payloads(count, seed=seed)
+
+    result = loadtest.LoadTestResult()
+    console.print(f"Sending {len(payloads)} events at {rate:g}/s with concurrency {concurrency}")
+    if target:
+        loadtest.run(target.rstrip("/") + path, payloads, secret, rate, concurrency, result)
+    else:
+        from taskplanner.wsgi import application
+
+        with (
+            loadtest.TodoistStub() as stub,
+            loadtest.redirect_todoist_api(stub.base_url),
+            loadtest.count_lock_errors(result),
+            loadtest.serve_wsgi(application) as base_url,
+        ):
+            loadtest.run(base_url + path, payloads, secret, rate, concurrency, result)
+        result.stub_calls = stub.calls
+
+    summary = result.summary()
+    table = Table(title="Webhook load test")
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    for key, value in summary.items():
+        table.add_row(key, str(value))
+    console.print(table)
+
+    if baseline_path:
+        table = Table(title=f"Compared with {baseline_path}")
+        for column in ("Metric", "Baseline", "Current", "Change"):
+            table.add_column(column)
+        for row in loadtest.compare(summary, loadtest.read_summary(baseline_path)):
+            table.add_row(*(str(value) for value in row))
+        console.print(table)
+
+    if output:
+        options = {"requests": len(payloads), "rate": rate, "concurrency": concurrency, "seed": seed, "path": path}
+        loadtest.write_summary(output, summary, options)
+        console.print(f"Summary written to {output}")
@@ -0,0 +1,97 @@
+"""
+Schedule a season of task groups from one template.
+
+The CSV needs an ``anchor_date`` column (YYYY-MM-DD, usually the sowing date)
+plus one column per token field of the template's parent task model, e.g.::
+
+    anchor_date,crop,sku,variety_name,bed
+    2026-03-01,Chilli,CH001,Habanero,A1
+"""
+
+import csv
+from datetime import date
+
+import djclick as click
+from django.conf import settings
+from rich.console import Console
+from rich.table import Table
+
+from tasks.creation import GroupRequest, create_groups, get_sync_client
+from tasks.idempotency import make_idempotency_key
+from tasks.scheduling import Occupancy, find_bed_conflicts, get_bed_occupancy, schedule_groups
+from todosync.models import BaseTaskGroupTemplate
+
+
+@click.command()
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--template", "template_id", type=int, required=True, help="Task group template ID")
+@click.option("--create", is_flag=True, help="Create the scheduled task groups in Todoist")
+@click.option("--allow-conflicts", is_flag=True, help="Create even if bed occupancy conflicts were found")
+def command(csv_path, template_id, create, allow_conflicts):
+    """Compute start/due dates for a season of task groups and check bed conflicts."""
+    console = Console()
+    template = BaseTaskGroupTemplate.objects.get(pk=template_id)
+    parent_task_model = template.get_parent_task_model()
+    token_field_names = template.get_token_field_names()
+
+    groups = []
+    with open(csv_path, newline="") as f:
+        reader = csv.DictReader(f)
+        if "anchor_date" not in (reader.fieldnames or []):
+            raise click.ClickException(f"{csv_path} has no anchor_date column")
+        for row in reader:
+            token_values = {name: (row.get(name) or "").strip() for name in token_field_names}
+            try:
+                anchor_date = date.fromisoformat((row["anchor_date"] or "").strip())
+            except ValueError:
+                raise click.ClickException(
+                    f"Row {reader.line_num}: anchor_date {row['anchor_date']!r} is not a YYYY-MM-DD date"
+                ) from None
+            groups.append((token_values, anchor_date))
+
+    schedules = schedule_groups(template, groups)
+
+    table = Table(title=f"{template.title}: {len(schedules)} groups")
+    for column in ("Group", "Bed", "Anchor", "Start", "End"):
+        table.add_column(column)
+    planned = []
+    for schedule in schedules:
+        label = parent_task_model(**schedule.token_values).get_parent_task_title() if parent_task_model else ""
+        table.add_row(label, schedule.bed, str(schedule.anchor_date), str(schedule.start), str(schedule.end))
+        planned.append(Occupancy(bed=schedule.bed, label=label, start=schedule.start, end=schedule.end))
+    console.print(table)
+
+    conflicts = find_bed_conflicts(get_bed_occupancy() + planned)
+    for conflict in conflicts:
+        console.print(
+            f"[yellow]Bed {conflict.bed}:[/yellow] {conflict.first.label} ({conflict.first.start} to "
+            f"{conflict.first.end}) overlaps {conflict.second.label} ({conflict.second.start} to {conflict.second.end})"
+        )
+
+    if not create:
+        return
+    if conflicts and not allow_conflicts:
+        raise click.ClickException(f"{len(conflicts)} bed conflict(s) found; use --allow-conflicts to create anyway")
+    if settings.DRY_RUN_TASK_CREATION:
+        console.print("[cyan]DRY_RUN_TASK_CREATION is enabled; no tasks were created.[/cyan]")
+        return
+
+    # Keys are stable per group and anchor date, so re-running the command does not create a group twice
+    requests = [
+        GroupRequest(
+            template=template,
+            token_values=schedule.token_values,
+            tasks=schedule.tasks,
+            key=make_idempotency_key(template.pk, schedule.token_values, "", f"season:{schedule.anchor_date}"),
+        )
+        for schedule in schedules
+    ]
+    with console.status(f"Creating {len(requests)} task groups..."):
+        created = create_groups(get_sync_client(), requests)
+
+    failed = [request for request in requests if not request.is_complete]
+    for request in failed:
+        console.print(f"[red]{request.parent_args()['content']}:[/red] {request.errors or 'incomplete'}")
+    console.print(f"[green]Created {len(requests) - len(failed)} task groups ({created} Todoist tasks).[/green]")
+    if failed:
+        raise click.ClickException(f"{len(failed)} task group(s) were not fully created")
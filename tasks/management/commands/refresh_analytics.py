@@ -0,0 +1,12 @@
+import djclick as click
+
+from tasks.analytics import rebuild
+
+
+@click.command()
+@click.option("--season", type=int, help="Only rebuild this season (year)")
+def command(season):
+    """Rebuild the crop analytics rollup from current and archived task groups."""
+    count = rebuild(season)
+    scope = f"season {season}" if season else "all seasons"
+    click.secho(f"Wrote {count} analytics rows for {scope}", fg="green")
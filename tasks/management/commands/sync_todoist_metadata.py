@@ -0,0 +1,21 @@
+import djclick as click
+import requests
+
+from tasks.todoist_mirror import is_stale, refresh_mirror
+
+
+@click.command()
+@click.option("--if-stale", is_flag=True, help="Only refresh when the mirror is older than TODOIST_MIRROR_TTL")
+def command(if_stale):
+    """Refresh the local mirror of Todoist projects, sections and labels."""
+    if if_stale and not is_stale():
+        click.secho("Todoist mirror is up to date", fg="cyan")
+        return
+    try:
+        counts = refresh_mirror()
+    except requests.RequestException as e:
+        raise click.ClickException(f"Could not sync from Todoist: {e}") from e
+    click.secho(
+        f"Synced {counts['projects']} projects, {counts['sections']} sections and {counts['labels']} labels",
+        fg="green",
+    )
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_alter_croptaskgrouptemplate_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTaskGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField(help_text='Year the task group was created')),
+                ('template_title', models.CharField(max_length=255)),
+                ('parent_task_type', models.CharField(help_text='Model label of the original parent task', max_length=100)),
+                ('title', models.CharField(max_length=255)),
+                ('todo_id', models.CharField(blank=True, max_length=100)),
+                ('token_values', models.JSONField(default=dict)),
+                ('subtasks', models.JSONField(default=list)),
+                ('search_text', models.TextField(blank=True, help_text='Lowercased title and token values, for searching')),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Task Group',
+                'verbose_name_plural': 'Archived Task Groups',
+                'ordering': ['-season', 'title'],
+                'indexes': [models.Index(fields=['season', 'template_title'], name='tasks_archi_season_6125fa_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_archivedtaskgroup'),
+        ('todosync', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskGroupCreation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('token_values', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('partial', 'Partially created'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('expected_task_count', models.PositiveIntegerField(default=0)),
+                ('created_task_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('parent_task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='creations', to='todosync.baseparenttask')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='creations', to='todosync.basetaskgrouptemplate')),
+            ],
+            options={
+                'verbose_name': 'Task Group Creation',
+                'verbose_name_plural': 'Task Group Creations',
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_taskgroupcreation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TodoistLabel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('todo_id', models.CharField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('synced_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Todoist Label',
+                'verbose_name_plural': 'Todoist Labels',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TodoistProject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('todo_id', models.CharField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('parent_id', models.CharField(blank=True, max_length=100)),
+                ('synced_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Todoist Project',
+                'verbose_name_plural': 'Todoist Projects',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TodoistSection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('todo_id', models.CharField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('project_id', models.CharField(db_index=True, max_length=100)),
+                ('synced_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Todoist Section',
+                'verbose_name_plural': 'Todoist Sections',
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_todoist_mirror'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CropAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField()),
+                ('crop', models.CharField(blank=True, max_length=200)),
+                ('variety_name', models.CharField(blank=True, max_length=200)),
+                ('bed', models.CharField(blank=True, max_length=100)),
+                ('label', models.CharField(blank=True, max_length=100)),
+                ('group_count', models.PositiveIntegerField(default=0)),
+                ('task_count', models.PositiveIntegerField(default=0)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('overdue_count', models.PositiveIntegerField(default=0)),
+                ('sow_to_harvest_days', models.PositiveIntegerField(default=0, help_text='Sum over groups with both dates')),
+                ('sow_to_harvest_count', models.PositiveIntegerField(default=0, help_text='Groups with both sow and harvest dates')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Crop Analytics',
+                'verbose_name_plural': 'Crop Analytics',
+                'indexes': [models.Index(fields=['label', 'season', 'crop'], name='tasks_cropa_label_2483ad_idx'), models.Index(fields=['label', 'season', 'bed'], name='tasks_cropa_label_58b900_idx')],
+                'constraints': [models.UniqueConstraint(fields=('season', 'crop', 'variety_name', 'bed', 'label'), name='unique_crop_analytics_cell')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_cropanalytics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskgroupcreation',
+            name='description',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='taskgroupcreation',
+            name='tasks',
+            field=models.JSONField(default=list, help_text='Task tree being created, as it was when first submitted'),
+        ),
+        migrations.AddField(
+            model_name='taskgroupcreation',
+            name='created_nodes',
+            field=models.JSONField(default=dict, help_text='Todoist task id of each created node, by tree path'),
+        ),
+    ]
@@ -1,4 +1,7 @@
+from datetime import timedelta
+
 from django.db import models
+from django.utils import timezone
 
 from todosync.models import BaseParentTask, BaseTaskGroupTemplate
 
@@ -51,3 +54,163 @@ class CropTaskGroupTemplate(BaseTaskGroupTemplate):
     class Meta:
         verbose_name = "Crop Template"
         verbose_name_plural = "Crop Templates"
+
+
+class ArchivedTaskGroup(models.Model):
+    """Compact, read-only copy of a completed task group from a closed season."""
+
+    season = models.PositiveSmallIntegerField(help_text="Year the task group was created")
+    template_title = models.CharField(max_length=255)
+    parent_task_type = models.CharField(max_length=100, help_text="Model label of the original parent task")
+    title = models.CharField(max_length=255)
+    todo_id = models.CharField(max_length=100, blank=True)
+    token_values = models.JSONField(default=dict)
+    subtasks = models.JSONField(default=list)
+    search_text = models.TextField(blank=True, help_text="Lowercased title and token values, for searching")
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archived Task Group"
+        verbose_name_plural = "Archived Task Groups"
+        ordering = ["-season", "title"]
+        indexes = [models.Index(fields=["season", "template_title"])]
+
+    def __str__(self):
+        return f"{self.title} ({self.season})"
+
+
+class TaskGroupCreation(models.Model):
+    """Outcome of a task group creation request, keyed by its idempotency key."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        COMPLETED = "completed", "Completed"
+        PARTIAL = "partial", "Partially created"
+        FAILED = "failed", "Failed"
+
+    # A pending creation older than this is assumed to have died and can be resumed by hand
+    STALE_AFTER = timedelta(minutes=10)
+
+    key = models.CharField(max_length=64, unique=True)
+    template = models.ForeignKey(BaseTaskGroupTemplate, on_delete=models.CASCADE, related_name="creations")
+    token_values = models.JSONField(default=dict)
+    description = models.TextField(blank=True)
+    tasks = models.JSONField(default=list, help_text="Task tree being created, as it was when first submitted")
+    created_nodes = models.JSONField(default=dict, help_text="Todoist task id of each created node, by tree path")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    parent_task = models.ForeignKey(
+        BaseParentTask, null=True, blank=True, on_delete=models.SET_NULL, related_name="creations"
+    )
+    expected_task_count = models.PositiveIntegerField(default=0)
+    created_task_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Task Group Creation"
+        verbose_name_plural = "Task Group Creations"
+
+    def __str__(self):
+        return f"{self.template} ({self.get_status_display()})"
+
+    def is_stale(self):
+        return self.status == self.Status.PENDING and self.updated_at < timezone.now() - self.STALE_AFTER
+
+    def can_retry(self):
+        """Whether submitting the same form again should run the creation: nothing was created yet, or some was."""
+        if self.status == self.Status.FAILED:
+            return not self.created_nodes
+        return self.status == self.Status.PARTIAL
+
+    def can_resume(self):
+        """Whether the missing tasks can be created: partial creations, and pending ones that stopped responding."""
+        return self.status == self.Status.PARTIAL or self.is_stale()
+
+
+class TodoistProject(models.Model):
+    """Local mirror of a Todoist project, refreshed by ``sync_todoist_metadata``."""
+
+    todo_id = models.CharField(max_length=100, unique=True)
+    name = models.CharField(max_length=255)
+    parent_id = models.CharField(max_length=100, blank=True)
+    synced_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Todoist Project"
+        verbose_name_plural = "Todoist Projects"
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class TodoistSection(models.Model):
+    """Local mirror of a Todoist section."""
+
+    todo_id = models.CharField(max_length=100, unique=True)
+    name = models.CharField(max_length=255)
+    project_id = models.CharField(max_length=100, db_index=True)
+    synced_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Todoist Section"
+        verbose_name_plural = "Todoist Sections"
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class TodoistLabel(models.Model):
+    """Local mirror of a Todoist personal label."""
+
+    todo_id = models.CharField(max_length=100, unique=True)
+    name = models.CharField(max_length=255)
+    synced_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Todoist Label"
+        verbose_name_plural = "Todoist Labels"
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class CropAnalytics(models.Model):
+    """
+    Precomputed rollup of crop task groups, one row per (season, crop, variety, bed, label).
+
+    Rows with an empty label total every task of the matching groups; labelled
+    rows only count tasks carrying that label.
+    """
+
+    season = models.PositiveSmallIntegerField()
+    crop = models.CharField(max_length=200, blank=True)
+    variety_name = models.CharField(max_length=200, blank=True)
+    bed = models.CharField(max_length=100, blank=True)
+    label = models.CharField(max_length=100, blank=True)
+    group_count = models.PositiveIntegerField(default=0)
+    task_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    overdue_count = models.PositiveIntegerField(default=0)
+    sow_to_harvest_days = models.PositiveIntegerField(default=0, help_text="Sum over groups with both dates")
+    sow_to_harvest_count = models.PositiveIntegerField(default=0, help_text="Groups with both sow and harvest dates")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Crop Analytics"
+        verbose_name_plural = "Crop Analytics"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["season", "crop", "variety_name", "bed", "label"], name="unique_crop_analytics_cell"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["label", "season", "crop"]),
+            models.Index(fields=["label", "season", "bed"]),
+        ]
+
+    def __str__(self):
+        return f"{self.season} {self.crop} {self.variety_name} {self.bed} {self.label}".strip()
@@ -0,0 +1,143 @@
+"""
+On-demand request profiling.
+
+When ``PROFILING_ENABLED`` is set, ``ProfilingMiddleware`` profiles requests
+from staff users that send an ``X-Profile`` header or ``_profile`` query
+parameter, plus one in every ``PROFILING_SAMPLE_RATE`` requests (if set),
+which also covers unauthenticated webhook calls. Each profile is saved under
+``LOG_DIR/profiles`` as a cProfile dump and a JSON file with the SQL queries
+and their timings, and can be browsed at ``/admin/profiles/``.
+
+The middleware is only installed when profiling is enabled, so it costs
+nothing otherwise.
+"""
+
+import cProfile
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.text import slugify
+
+HEADER = "HTTP_X_PROFILE"
+QUERY_PARAM = "_profile"
+
+# Oldest profiles beyond this count are deleted when a new one is saved
+MAX_PROFILES = 200
+
+PROFILE_NAME_RE = re.compile(r"^[\w-]+$")
+
+# cProfile can only run one profiler at a time, so concurrent requests are not profiled
+_profiler_lock = threading.Lock()
+
+
+def get_profile_dir():
+    return Path(settings.LOG_DIR) / "profiles"
+
+
+class QueryRecorder:
+    """Database execute wrapper that records each query with its duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                {
+                    "alias": context["connection"].alias,
+                    "sql": sql,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                }
+            )
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+
+    def __call__(self, request):
+        if not self.should_profile(request) or not _profiler_lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request)
+        finally:
+            _profiler_lock.release()
+
+    def should_profile(self, request):
+        if HEADER in request.META or QUERY_PARAM in request.GET:
+            return request.user.is_staff
+        return self.sample_rate > 0 and random.randrange(self.sample_rate) == 0
+
+    def profile(self, request):
+        recorder = QueryRecorder()
+        profiler = cProfile.Profile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            duration = time.perf_counter() - started
+
+        save_profile(request, response, profiler, recorder.queries, duration)
+        return response
+
+
+def save_profile(request, response, profiler, queries, duration):
+    profile_dir = get_profile_dir()
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    now = timezone.now()
+    name = f"{now:%Y%m%d-%H%M%S}-{slugify(request.path)[:60] or 'root'}-{uuid.uuid4().hex[:6]}"
+
+    profiler.dump_stats(profile_dir / f"{name}.prof")
+    metadata = {
+        "name": name,
+        "created_at": now.isoformat(),
+        "method": request.method,
+        "path": request.get_full_path(),
+        "status": response.status_code,
+        "user": request.user.get_username() if getattr(request, "user", None) else "",
+        "duration_ms": round(duration * 1000, 3),
+        "query_count": len(queries),
+        "query_ms": round(sum(query["duration_ms"] for query in queries), 3),
+        "queries": queries,
+    }
+    (profile_dir / f"{name}.json").write_text(json.dumps(metadata, indent=2))
+
+    for old in sorted(profile_dir.glob("*.json"))[:-MAX_PROFILES]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def list_profiles():
+    """Saved profile summaries, newest first."""
+    profiles = []
+    for path in sorted(get_profile_dir().glob("*.json"), reverse=True):
+        metadata = json.loads(path.read_text())
+        metadata.pop("queries", None)
+        profiles.append(metadata)
+    return profiles
+
+
+def get_profile_path(name, suffix):
+    """Path of a saved profile file, or None if ``name`` is not a valid profile name."""
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    path = get_profile_dir() / f"{name}{suffix}"
+    return path if path.exists() else None
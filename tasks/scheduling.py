@@ -0,0 +1,159 @@
+"""
+Relative-date scheduling for crop task groups.
+
+Template tasks may carry ``start_offset_days`` and ``due_offset_days``, counted
+from a per-group anchor date (usually the sowing date). The offsets of a
+template are flattened once, then applied to every group in a season in a
+single pass using ordinal date arithmetic, so planning hundreds of groups
+costs one walk of the template tree.
+"""
+
+import copy
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db.models import Max, Min
+from django.db.models.functions import Coalesce
+
+from .models import CropTask
+
+START_OFFSET_KEY = "start_offset_days"
+DUE_OFFSET_KEY = "due_offset_days"
+
+
+@dataclass(frozen=True)
+class TaskOffset:
+    """Offsets of a single template task, addressed by its position in the tree."""
+
+    path: tuple[int, ...]
+    start: int | None
+    due: int | None
+
+
+@dataclass
+class Occupancy:
+    """A bed held by a task group between two dates (inclusive)."""
+
+    bed: str
+    label: str
+    start: date
+    end: date
+
+
+@dataclass
+class GroupSchedule:
+    """Computed dates for one task group."""
+
+    token_values: dict
+    anchor_date: date
+    tasks: list = field(default_factory=list)
+    start: date | None = None
+    end: date | None = None
+
+    @property
+    def bed(self):
+        return self.token_values.get("bed", "")
+
+
+@dataclass(frozen=True)
+class BedConflict:
+    bed: str
+    first: Occupancy
+    second: Occupancy
+
+
+def get_task_offsets(tasks):
+    """Flatten the offsets of a template task tree, skipping tasks without any."""
+    offsets = []
+    for index, task in enumerate(tasks or []):
+        if task.get(START_OFFSET_KEY) is not None or task.get(DUE_OFFSET_KEY) is not None:
+            offsets.append(TaskOffset((index,), task.get(START_OFFSET_KEY), task.get(DUE_OFFSET_KEY)))
+        for sub_index, subtask in enumerate(task.get("subtasks") or []):
+            if subtask.get(START_OFFSET_KEY) is not None or subtask.get(DUE_OFFSET_KEY) is not None:
+                offsets.append(
+                    TaskOffset((index, sub_index), subtask.get(START_OFFSET_KEY), subtask.get(DUE_OFFSET_KEY))
+                )
+    return offsets
+
+
+def _get_node(tasks, path):
+    node = tasks[path[0]]
+    if len(path) > 1:
+        node = node["subtasks"][path[1]]
+    return node
+
+
+def schedule_groups(template, groups):
+    """
+    Compute start and due dates for many groups created from one template.
+
+    ``groups`` is an iterable of ``(token_values, anchor_date)`` pairs. Each
+    returned schedule carries a copy of the template's task tree with
+    ``start_date`` / ``due_date`` set as ISO strings, ready to be passed to the
+    Todoist create call in place of ``template.tasks``.
+    """
+    offsets = get_task_offsets(template.tasks)
+    start_offsets = [offset.start for offset in offsets]
+    due_offsets = [offset.due for offset in offsets]
+    bounds = [value for value in start_offsets + due_offsets if value is not None]
+    low, high = (min(bounds), max(bounds)) if bounds else (0, 0)
+
+    schedules = []
+    for token_values, anchor_date in groups:
+        anchor = anchor_date.toordinal()
+        starts = [None if value is None else date.fromordinal(anchor + value) for value in start_offsets]
+        dues = [None if value is None else date.fromordinal(anchor + value) for value in due_offsets]
+
+        tasks = copy.deepcopy(template.tasks or [])
+        for offset, start, due in zip(offsets, starts, dues, strict=True):
+            node = _get_node(tasks, offset.path)
+            if start is not None:
+                node["start_date"] = start.isoformat()
+            if due is not None:
+                node["due_date"] = due.isoformat()
+
+        schedules.append(
+            GroupSchedule(
+                token_values=token_values,
+                anchor_date=anchor_date,
+                tasks=tasks,
+                start=date.fromordinal(anchor + low),
+                end=date.fromordinal(anchor + high),
+            )
+        )
+    return schedules
+
+
+def get_bed_occupancy():
+    """Return the date range each existing crop task group occupies its bed, from its subtask dates."""
+    groups = (
+        CropTask.objects.exclude(bed="")
+        .annotate(
+            first_date=Min(Coalesce("subtasks__start_date", "subtasks__due_date")),
+            last_date=Max(Coalesce("subtasks__due_date", "subtasks__start_date")),
+        )
+        .filter(first_date__isnull=False)
+    )
+    return [
+        Occupancy(bed=group.bed, label=group.get_parent_task_title(), start=group.first_date, end=group.last_date)
+        for group in groups
+    ]
+
+
+def find_bed_conflicts(occupancies):
+    """Return every pair of occupancies that hold the same bed on overlapping dates."""
+    by_bed = defaultdict(list)
+    for occupancy in occupancies:
+        if occupancy.bed:
+            by_bed[occupancy.bed].append(occupancy)
+
+    conflicts = []
+    for bed, items in by_bed.items():
+        items.sort(key=lambda occupancy: occupancy.start)
+        active = []
+        for occupancy in items:
+            active = [other for other in active if other.end >= occupancy.start]
+            conflicts.extend(BedConflict(bed, other, occupancy) for other in active)
+            active.append(occupancy)
+    return conflicts
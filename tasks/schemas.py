@@ -0,0 +1,55 @@
+"""JSON schemas for the django-jsonform widgets used by the tasks app."""
+
+OFFSET_PROPERTIES = {
+    "start_offset_days": {
+        "type": "integer",
+        "title": "Start (days after anchor date)",
+    },
+    "due_offset_days": {
+        "type": "integer",
+        "title": "Due (days after anchor date)",
+    },
+}
+
+# Same shape as todosync's task schema, with optional day offsets relative to the
+# group's anchor date (e.g. the sowing date) on tasks and subtasks.
+CROP_TASKS_SCHEMA = {
+    "type": "array",
+    "title": "Tasks",
+    "items": {
+        "type": "object",
+        "title": "Task",
+        "properties": {
+            "title": {
+                "type": "string",
+                "title": "Title",
+            },
+            "labels": {
+                "type": "string",
+                "title": "Labels (comma-separated)",
+            },
+            **OFFSET_PROPERTIES,
+            "subtasks": {
+                "type": "array",
+                "title": "Subtasks",
+                "items": {
+                    "type": "object",
+                    "title": "Subtask",
+                    "properties": {
+                        "title": {
+                            "type": "string",
+                            "title": "Title",
+                        },
+                        "labels": {
+                            "type": "string",
+                            "title": "Labels (comma-separated)",
+                        },
+                        **OFFSET_PROPERTIES,
+                    },
+                    "required": ["title"],
+                },
+            },
+        },
+        "required": ["title"],
+    },
+}
@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils.formats import date_format
+from django.utils.timezone import localtime
+
+from todosync.models import BaseParentTask, BaseTaskGroupTemplate, LabelActionRule, Task, TaskSyncSettings
+
+from .analytics import get_cell_key, get_group_cell_key, get_saved_cell_key, mark_dirty
+from .events import broker
+from .forms import invalidate_template_forms
+from .label_rules import invalidate_cached_rules
+from .models import BiennialCropTask, CropTask
+
+TRACKED_FIELDS = ["completed", "start_date", "due_date"]
+
+
+def _get_parent_attname():
+    return BaseParentTask._meta.get_field("subtasks").field.attname
+
+
+def _task_state(task):
+    # Read from __dict__ so deferred fields are not loaded just to track them
+    return {name: task.__dict__.get(name) for name in TRACKED_FIELDS}
+
+
+@receiver(post_init, sender=Task)
+def remember_task_state(sender, instance, **kwargs):
+    """Keep the loaded values so saves can report what changed."""
+    instance._event_previous = _task_state(instance)
+
+
+@receiver(post_save, sender=Task)
+def publish_task_event(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_event_previous", None)
+    current = _task_state(instance)
+    instance._event_previous = current
+    if not created and previous == current:
+        return
+
+    data = {
+        "id": instance.pk,
+        "parent_id": getattr(instance, _get_parent_attname()),
+        "title": instance.title,
+        "action": "created" if created else "updated",
+        **current,
+    }
+    if not created:
+        data["previous"] = previous
+    transaction.on_commit(lambda: broker.publish("task", data))
+
+
+@receiver(post_save)
+def publish_group_event(sender, instance, created, **kwargs):
+    if not created or not isinstance(instance, BaseParentTask):
+        return
+    data = {
+        "id": instance.pk,
+        "template_id": instance.template_id,
+        "title": instance.get_parent_task_title(),
+        "todo_id": instance.todo_id,
+        "created_at": date_format(localtime(instance.created_at), "d M Y") if instance.created_at else "",
+    }
+    transaction.on_commit(lambda: broker.publish("group", data))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_template_form_cache(sender, instance, **kwargs):
+    if isinstance(instance, BaseTaskGroupTemplate):
+        invalidate_template_forms(instance.pk)
+
+
+@receiver(post_init, sender=CropTask)
+@receiver(post_init, sender=BiennialCropTask)
+def remember_group_cell(sender, instance, **kwargs):
+    instance._analytics_key = get_saved_cell_key(instance)
+
+
+@receiver(post_save, sender=CropTask)
+@receiver(post_save, sender=BiennialCropTask)
+def refresh_group_analytics(sender, instance, **kwargs):
+    key = get_cell_key(instance)
+    mark_dirty(getattr(instance, "_analytics_key", None), key)
+    instance._analytics_key = key
+
+
+@receiver(post_delete, sender=CropTask)
+@receiver(post_delete, sender=BiennialCropTask)
+def refresh_deleted_group_analytics(sender, instance, **kwargs):
+    mark_dirty(getattr(instance, "_analytics_key", None) or get_cell_key(instance))
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def refresh_task_analytics(sender, instance, **kwargs):
+    parent_id = getattr(instance, _get_parent_attname())
+    if parent_id is not None:
+        mark_dirty(get_group_cell_key(parent_id))
+
+
+@receiver(post_save, sender=LabelActionRule)
+@receiver(post_delete, sender=LabelActionRule)
+@receiver(post_save, sender=TaskSyncSettings)
+def invalidate_label_rule_cache(sender, **kwargs):
+    invalidate_cached_rules()
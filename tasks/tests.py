@@ -1,9 +1,64 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import threading
+from datetime import date, timedelta
+from types import SimpleNamespace
+
 import pytest
+import requests
+from django.db import connection, models
+from django.test import AsyncRequestFactory, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
 from todosync.forms import BaseTaskGroupCreationForm
-from todosync.models import BaseTaskGroupTemplate, TaskSyncSettings
+from todosync.models import BaseTaskGroupTemplate, LabelActionRule, Task, TaskSyncSettings
 
-from .models import BiennialCropTask, CropTask, CropTaskGroupTemplate
+from .analytics import compute_rows, rebuild, records_from_groups
+from .archive import archive_season, get_current_season
+from .creation import GroupRequest, count_nodes, create_groups
+from .events import EventBroker
+from .events import broker as event_broker
+from .forms import (
+    CachedTaskGroupCreationForm,
+    TaskGroupTemplateForm,
+    get_task_group_form_class,
+    get_template_version,
+    task_group_creation_form,
+)
+from .idempotency import issue_form_nonce, make_idempotency_key
+from .label_rules import get_cached_rules, get_todosync_webhook, serve_cached_rules
+from .loadtest import (
+    TodoistStub,
+    benchmark_view,
+    build_payloads,
+    count_rule_queries,
+    percentile,
+    redirect_todoist_api,
+    sign_payload,
+)
+from .loadtest import compare as loadtest_compare
+from .models import (
+    ArchivedTaskGroup,
+    BiennialCropTask,
+    CropAnalytics,
+    CropTask,
+    CropTaskGroupTemplate,
+    TaskGroupCreation,
+    TodoistLabel,
+    TodoistProject,
+    TodoistSection,
+)
+from .profiling import get_profile_path, list_profiles
+from .scheduling import Occupancy, find_bed_conflicts, get_task_offsets, schedule_groups
+from .storage import minify_css
+from .todoist_mirror import is_stale, normalise_labels, refresh_mirror
+from .views import events as events_view
+from .views import webhook
 
 
 @pytest.fixture
@@ -223,3 +278,890 @@ class TestTaskGroupCreationForm:
     def test_template_field_populated_with_template_id(self, task_group_template):
         form = BaseTaskGroupCreationForm(template_id=task_group_template.id)
         assert form.fields["task_group_template"].initial == task_group_template
+
+
+@pytest.fixture
+def scheduled_template(db, sync_settings):
+    """Create a CropTaskGroupTemplate whose tasks carry day offsets"""
+    return CropTaskGroupTemplate.objects.create(
+        title="Scheduled Chilli Template",
+        description="",
+        tasks=[
+            {"title": "Sow {sku}", "labels": "sow", "due_offset_days": 0, "subtasks": []},
+            {
+                "title": "Harvest {variety_name}",
+                "labels": "harvest",
+                "start_offset_days": 90,
+                "due_offset_days": 120,
+                "subtasks": [{"title": "{sku} checked in", "labels": "processing", "due_offset_days": 125}],
+            },
+            {"title": "Label {sku}", "labels": "", "subtasks": []},
+        ],
+    )
+
+
+@pytest.mark.django_db
+class TestScheduling:
+    """Tests for relative-date scheduling of task groups"""
+
+    def test_get_task_offsets(self, scheduled_template):
+        offsets = get_task_offsets(scheduled_template.tasks)
+        assert [(offset.path, offset.start, offset.due) for offset in offsets] == [
+            ((0,), None, 0),
+            ((1,), 90, 120),
+            ((1, 0), None, 125),
+        ]
+
+    def test_schedule_groups_sets_dates(self, scheduled_template):
+        [schedule] = schedule_groups(scheduled_template, [({"sku": "CH001", "bed": "A1"}, date(2026, 3, 1))])
+        assert schedule.tasks[0]["due_date"] == "2026-03-01"
+        assert schedule.tasks[1]["start_date"] == "2026-05-30"
+        assert schedule.tasks[1]["due_date"] == "2026-06-29"
+        assert schedule.tasks[1]["subtasks"][0]["due_date"] == "2026-07-04"
+        assert "due_date" not in schedule.tasks[2]
+        assert (schedule.start, schedule.end) == (date(2026, 3, 1), date(2026, 7, 4))
+        assert schedule.bed == "A1"
+
+    def test_schedule_groups_leaves_template_untouched(self, scheduled_template):
+        schedule_groups(scheduled_template, [({}, date(2026, 3, 1))])
+        assert "due_date" not in scheduled_template.tasks[0]
+
+    def test_find_bed_conflicts(self):
+        first = Occupancy(bed="A1", label="first", start=date(2026, 3, 1), end=date(2026, 6, 1))
+        second = Occupancy(bed="A1", label="second", start=date(2026, 5, 1), end=date(2026, 8, 1))
+        third = Occupancy(bed="A1", label="third", start=date(2026, 8, 2), end=date(2026, 9, 1))
+        other_bed = Occupancy(bed="B1", label="other", start=date(2026, 3, 1), end=date(2026, 9, 1))
+        conflicts = find_bed_conflicts([third, other_bed, second, first])
+        assert [(c.bed, c.first.label, c.second.label) for c in conflicts] == [("A1", "first", "second")]
+
+
+class FakeSyncClient:
+    """Stands in for the Todoist Sync API, accepting commands until ``fail_after`` have run"""
+
+    def __init__(self, fail_after=None):
+        self.requests = []
+        self.fail_after = fail_after
+        self.executed = 0
+
+    @property
+    def commands(self):
+        return [command for commands in self.requests for command in commands]
+
+    def run(self, commands):
+        self.requests.append(commands)
+        sync_status, temp_id_mapping = {}, {}
+        for command in commands:
+            if self.fail_after is not None and self.executed >= self.fail_after:
+                sync_status[command["uuid"]] = {"error_code": 42, "error": "Service unavailable"}
+                continue
+            self.executed += 1
+            sync_status[command["uuid"]] = "ok"
+            temp_id_mapping[command["temp_id"]] = str(5000 + self.executed)
+        return sync_status, temp_id_mapping
+
+
+@pytest.mark.django_db
+class TestTaskGroupCreation:
+    """Tests for creating task groups through the Todoist Sync API"""
+
+    def test_scheduled_dates_are_sent(self, scheduled_template):
+        [schedule] = schedule_groups(
+            scheduled_template, [({"sku": "CH001", "variety_name": "Habanero", "bed": "A1"}, date(2026, 3, 1))]
+        )
+        client = FakeSyncClient()
+        group = GroupRequest(scheduled_template, schedule.token_values, key="k1", tasks=schedule.tasks)
+        assert create_groups(client, [group]) == 5
+
+        args = {command["args"]["content"]: command["args"] for command in client.commands}
+        assert args["Sow CH001"]["due"] == {"date": "2026-03-01"}
+        assert "deadline" not in args["Sow CH001"]
+        assert args["Harvest Habanero"]["due"] == {"date": "2026-05-30"}
+        assert args["Harvest Habanero"]["deadline"] == {"date": "2026-06-29"}
+        assert args["CH001 checked in"]["due"] == {"date": "2026-07-04"}
+        assert "due" not in args["Label CH001"]
+
+        harvest = group.parent_task.subtasks.get(title="Harvest Habanero")
+        assert (harvest.start_date, harvest.due_date) == (date(2026, 5, 30), date(2026, 6, 29))
+        assert group.is_complete
+
+    def test_groups_are_batched(self, task_group_template):
+        groups = [
+            GroupRequest(task_group_template, {"sku": f"CH00{index}", "variety_name": "Habanero"}, key=f"k{index}")
+            for index in range(3)
+        ]
+        client = FakeSyncClient()
+        create_groups(client, groups)
+        assert len(client.requests) == 1
+        assert len(client.commands) == 12
+        assert CropTask.objects.count() == 3
+        subtask = client.commands[3]
+        assert subtask["args"]["parent_id"] == client.commands[2]["temp_id"]
+
+    def test_rejected_command_stops_group(self, task_group_template):
+        group = GroupRequest(task_group_template, {"sku": "CH001", "variety_name": "Habanero"}, key="k1")
+        create_groups(FakeSyncClient(fail_after=2), [group])
+        assert set(group.created_nodes) == {"parent", "0"}
+        assert group.errors and not group.is_complete
+
+
+class TestLoadTest:
+    """Tests for the webhook load-test helpers"""
+
+    def test_percentile(self):
+        values = [float(value) for value in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 95) == 95.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 50) == 0.0
+
+    def test_sign_payload(self):
+        body = b'{"event_name": "item:completed"}'
+        expected = base64.b64encode(hmac.new(b"secret", body, hashlib.sha256).digest()).decode()
+        assert sign_payload(body, "secret") == expected
+
+    @pytest.mark.django_db
+    def test_build_payloads_is_repeatable(self):
+        assert build_payloads(20, seed=3) == build_payloads(20, seed=3)
+        assert build_payloads(20, seed=3) != build_payloads(20, seed=4)
+
+    def test_compare(self):
+        rows = loadtest_compare({"p50_ms": 12.0, "errors": 0}, {"p50_ms": 10.0, "errors": 0})
+        assert rows == [("p50_ms", 10.0, 12.0, "+20.0%"), ("errors", 0, 0, "")]
+
+
+class TestEventBroker:
+    """Tests for the server-sent events broker"""
+
+    def test_publish_reaches_subscriber(self):
+        broker = EventBroker()
+
+        async def receive():
+            with broker.subscribe() as queue:
+                broker.publish("task", {"id": 1, "completed": True})
+                return await asyncio.wait_for(queue.get(), 1)
+
+        message = asyncio.run(receive())
+        assert message == 'event: task\ndata: {"id": 1, "completed": true}\n\n'
+
+    def test_publish_from_another_thread(self):
+        broker = EventBroker()
+
+        async def receive():
+            with broker.subscribe() as queue:
+                thread = threading.Thread(target=broker.publish, args=("group", {"id": 2}))
+                thread.start()
+                thread.join()
+                return await asyncio.wait_for(queue.get(), 1)
+
+        assert asyncio.run(receive()) == 'event: group\ndata: {"id": 2}\n\n'
+
+    def test_unsubscribes_on_exit(self):
+        broker = EventBroker()
+
+        async def subscribe():
+            with broker.subscribe():
+                pass
+
+        asyncio.run(subscribe())
+        broker.publish("task", {"id": 1})
+        assert broker._subscribers == set()
+
+
+@pytest.fixture
+def published_events(monkeypatch):
+    """Record what the model signals publish to the event broker"""
+    published = []
+    monkeypatch.setattr(event_broker, "publish", lambda event, data: published.append((event, data)))
+    return published
+
+
+@pytest.mark.django_db
+class TestLiveUpdateEvents:
+    """Tests for the signals and view behind the live updates stream"""
+
+    def test_group_creation_is_published(
+        self, task_group_template, published_events, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            group = CropTask.objects.create(
+                template=task_group_template, todo_id="100", sku="CH001", variety_name="Habanero"
+            )
+        assert ("group", group.pk) in [(event, data["id"]) for event, data in published_events]
+        [data] = [data for event, data in published_events if event == "group"]
+        assert data["template_id"] == task_group_template.pk
+        assert data["title"] == group.get_parent_task_title()
+        assert data["todo_id"] == "100"
+
+    def test_task_update_is_published_with_previous_state(
+        self, task_group_template, published_events, django_capture_on_commit_callbacks
+    ):
+        group = CropTask.objects.create(
+            template=task_group_template, todo_id="100", sku="CH001", variety_name="Habanero"
+        )
+        group.subtasks.create(title="Sow CH001", todo_id="101", due_date=date(2026, 3, 1))
+
+        task = Task.objects.get(todo_id="101")
+        task.completed = True
+        with django_capture_on_commit_callbacks(execute=True):
+            task.save()
+
+        [(event, data)] = published_events
+        assert event == "task"
+        assert data["action"] == "updated"
+        assert data["parent_id"] == group.pk
+        assert data["completed"] is True
+        assert data["previous"] == {"completed": False, "start_date": None, "due_date": date(2026, 3, 1)}
+
+    def test_unchanged_task_save_is_not_published(
+        self, task_group_template, published_events, django_capture_on_commit_callbacks
+    ):
+        group = CropTask.objects.create(
+            template=task_group_template, todo_id="100", sku="CH001", variety_name="Habanero"
+        )
+        group.subtasks.create(title="Sow CH001", todo_id="101")
+        with django_capture_on_commit_callbacks(execute=True):
+            Task.objects.get(todo_id="101").save()
+        assert published_events == []
+
+    def test_events_view_streams_published_events(self):
+        async def stream():
+            response = await events_view(AsyncRequestFactory().get(reverse("events")))
+            assert response["Content-Type"] == "text/event-stream"
+            chunks = response.streaming_content
+            first = await chunks.__anext__()
+            next_chunk = asyncio.ensure_future(chunks.__anext__())
+            while not event_broker._subscribers:
+                await asyncio.sleep(0)
+            event_broker.publish("task", {"id": 1, "completed": True})
+            second = await asyncio.wait_for(next_chunk, 1)
+            await chunks.aclose()
+            return first, second
+
+        first, second = asyncio.run(stream())
+        assert first == b"retry: 5000\n\n"
+        assert second == b'event: task\ndata: {"id": 1, "completed": true}\n\n'
+        assert event_broker._subscribers == set()
+
+    def test_events_view_is_empty_under_wsgi(self):
+        response = asyncio.run(events_view(RequestFactory().get(reverse("events"))))
+        assert response.status_code == 204
+        assert event_broker._subscribers == set()
+
+
+@pytest.fixture
+def last_season_groups(task_group_template):
+    """Create one completed and one unfinished crop task group from last season"""
+    completed = CropTask.objects.create(
+        template=task_group_template, todo_id="100", sku="CH001", variety_name="Habanero"
+    )
+    completed.subtasks.create(title="Sow CH001", todo_id="101", completed=True)
+    unfinished = CropTask.objects.create(
+        template=task_group_template, todo_id="200", sku="CH002", variety_name="Jalapeno"
+    )
+    unfinished.subtasks.create(title="Sow CH002", todo_id="201", completed=True)
+    unfinished.subtasks.create(title="Harvest Jalapeno", todo_id="202", completed=False)
+    last_season = timezone.now().replace(year=get_current_season() - 1, month=6, day=1)
+    CropTask.objects.update(created_at=last_season)
+    return completed, unfinished
+
+
+@pytest.mark.django_db
+class TestSeasonArchive:
+    """Tests for season archival"""
+
+    def test_archive_season_moves_completed_groups(self, last_season_groups):
+        completed, unfinished = last_season_groups
+        assert archive_season(get_current_season() - 1) == 1
+
+        assert not CropTask.objects.filter(pk=completed.pk).exists()
+        assert not Task.objects.filter(todo_id="101").exists()
+        assert CropTask.objects.filter(pk=unfinished.pk).exists()
+
+        archive = ArchivedTaskGroup.objects.get()
+        assert archive.todo_id == "100"
+        assert archive.token_values["sku"] == "CH001"
+        assert archive.subtasks[0]["title"] == "Sow CH001"
+        assert "habanero" in archive.search_text
+
+    def test_archive_season_skips_groups_without_subtasks(self, last_season_groups, task_group_template):
+        empty = CropTask.objects.create(
+            template=task_group_template, todo_id="300", sku="CH003", variety_name="Scotch Bonnet"
+        )
+        last_season = timezone.now().replace(year=get_current_season() - 1, month=6, day=1)
+        CropTask.objects.filter(pk=empty.pk).update(created_at=last_season)
+        assert archive_season(get_current_season() - 1) == 1
+        assert CropTask.objects.filter(pk=empty.pk).exists()
+
+    def test_archive_season_dry_run(self, last_season_groups):
+        assert archive_season(get_current_season() - 1, dry_run=True) == 1
+        assert CropTask.objects.count() == 2
+        assert not ArchivedTaskGroup.objects.exists()
+
+    def test_archive_season_refuses_open_season(self):
+        with pytest.raises(ValueError):
+            archive_season(get_current_season())
+
+
+@pytest.fixture
+def sync_client(monkeypatch, settings):
+    """Send task group creation from the create view to a FakeSyncClient"""
+    settings.DRY_RUN_TASK_CREATION = False
+    client = FakeSyncClient()
+    monkeypatch.setattr("tasks.views.get_sync_client", lambda: client)
+    return client
+
+
+@pytest.mark.django_db
+class TestIdempotentTaskGroupCreation:
+    """Tests for idempotency keys on task group creation"""
+
+    def post_data(self, client, template):
+        """Render the form, as a browser tab would, and return what submitting it posts."""
+        response = client.get(reverse("create-task-group"), {"template_id": template.id})
+        return {
+            "task_group_template": template.id,
+            "token_sku": "CH001",
+            "token_variety_name": "Habanero",
+            "form_nonce": response.context["form"]["form_nonce"].value(),
+        }
+
+    def submit(self, client, template):
+        return client.post(reverse("create-task-group"), self.post_data(client, template))
+
+    def test_make_idempotency_key(self):
+        key = make_idempotency_key(1, {"sku": "CH001", "bed": "A1"}, "", "nonce")
+        assert key == make_idempotency_key(1, {"bed": "A1", "sku": "CH001"}, "", "nonce")
+        assert key != make_idempotency_key(1, {"sku": "CH001", "bed": "A1"}, "", "other")
+        assert len(key) == 64
+
+    def test_count_nodes(self, task_group_template):
+        assert count_nodes(task_group_template.tasks) == 3
+
+    def test_repeat_submission_does_not_create_again(self, admin_client, task_group_template, sync_client):
+        data = self.post_data(admin_client, task_group_template)
+        admin_client.post(reverse("create-task-group"), data)
+        response = admin_client.post(reverse("create-task-group"), data)
+
+        assert len(sync_client.requests) == 1
+        assert response.status_code == 302
+        assert response.url == reverse("template-tasks", args=[task_group_template.id])
+        creation = TaskGroupCreation.objects.get()
+        assert creation.status == TaskGroupCreation.Status.COMPLETED
+        assert creation.created_task_count == 3
+        assert set(creation.created_nodes) == {"parent", "0", "1", "1.0"}
+        assert creation.parent_task.subtasks.count() == 3
+
+    def test_new_form_render_allows_new_creation(self, admin_client, task_group_template, sync_client):
+        for _ in range(2):
+            self.submit(admin_client, task_group_template)
+
+        assert len(sync_client.requests) == 2
+        assert TaskGroupCreation.objects.count() == 2
+
+    def test_forms_open_in_two_tabs_create_separately(self, admin_client, task_group_template, sync_client):
+        first = self.post_data(admin_client, task_group_template)
+        second = self.post_data(admin_client, task_group_template)
+        for data in (first, second, first):
+            admin_client.post(reverse("create-task-group"), data)
+
+        assert len(sync_client.requests) == 2
+        assert TaskGroupCreation.objects.count() == 2
+
+    def test_forged_nonce_is_rejected(self, admin_client, task_group_template, sync_client):
+        data = self.post_data(admin_client, task_group_template)
+        for nonce in ("forged", issue_form_nonce(task_group_template.id + 1)):
+            response = admin_client.post(reverse("create-task-group"), {**data, "form_nonce": nonce})
+            assert response.status_code == 200
+            assert response.context["form"].errors["form_nonce"]
+        assert not sync_client.requests
+        assert not TaskGroupCreation.objects.exists()
+
+    def test_dry_run_creates_nothing(self, admin_client, task_group_template, sync_client, settings):
+        settings.DRY_RUN_TASK_CREATION = True
+        self.submit(admin_client, task_group_template)
+        assert not sync_client.requests
+        assert not TaskGroupCreation.objects.exists()
+
+    def test_partial_creation_resumes_missing_nodes(self, admin_client, task_group_template, sync_client):
+        sync_client.fail_after = 2
+        self.submit(admin_client, task_group_template)
+        creation = TaskGroupCreation.objects.get()
+        assert creation.status == TaskGroupCreation.Status.PARTIAL
+        assert set(creation.created_nodes) == {"parent", "0"}
+
+        sync_client.fail_after = None
+        sent = len(sync_client.commands)
+        admin_client.post(reverse("resume-task-group-creation", args=[creation.pk]))
+
+        creation.refresh_from_db()
+        assert creation.status == TaskGroupCreation.Status.COMPLETED
+        resumed = sync_client.commands[sent:]
+        assert [command["args"]["content"] for command in resumed] == ["Harvest Habanero", "CH001 checked in"]
+        assert resumed[0]["args"]["parent_id"] == creation.created_nodes["parent"]
+        assert CropTask.objects.count() == 1
+        assert creation.parent_task.subtasks.count() == 3
+
+    def test_error_after_parent_created_is_partial(self, admin_client, task_group_template, sync_client, monkeypatch):
+        # One command per request, so the parent task is saved before the connection drops
+        monkeypatch.setattr("tasks.creation.COMMAND_BATCH_SIZE", 1)
+        run = sync_client.run
+
+        def fail_second_request(commands):
+            if sync_client.requests:
+                raise requests.ConnectionError("Todoist went away")
+            return run(commands)
+
+        monkeypatch.setattr(sync_client, "run", fail_second_request)
+        response = self.submit(admin_client, task_group_template)
+
+        assert response.status_code == 302
+        assert response.url == reverse("template-tasks", args=[task_group_template.id])
+        [message] = [str(message) for message in response.wsgi_request._messages]
+        assert "Todoist went away" in message and "Resume" in message
+        creation = TaskGroupCreation.objects.get()
+        assert creation.status == TaskGroupCreation.Status.PARTIAL
+        assert creation.parent_task is not None
+        assert creation.can_resume()
+
+    def test_stale_pending_is_not_rerun(self, admin_client, task_group_template, sync_client):
+        data = self.post_data(admin_client, task_group_template)
+        admin_client.post(reverse("create-task-group"), data)
+        creation = TaskGroupCreation.objects.get()
+        TaskGroupCreation.objects.filter(pk=creation.pk).update(
+            status=TaskGroupCreation.Status.PENDING,
+            updated_at=timezone.now() - TaskGroupCreation.STALE_AFTER * 2,
+        )
+        admin_client.post(reverse("create-task-group"), data)
+        assert len(sync_client.requests) == 1
+
+        creation.refresh_from_db()
+        assert creation.is_stale() and creation.can_resume() and not creation.can_retry()
+        admin_client.post(reverse("resume-task-group-creation", args=[creation.pk]))
+        creation.refresh_from_db()
+        assert creation.status == TaskGroupCreation.Status.COMPLETED
+        assert len(sync_client.requests) == 1
+        assert CropTask.objects.count() == 1
+
+
+@pytest.mark.django_db
+class TestCachedTaskGroupCreationForm:
+    """Tests for the per-template cached creation form classes"""
+
+    def test_fields_match_base_form(self, task_group_template):
+        cached = task_group_creation_form(template_id=task_group_template.id)
+        base = BaseTaskGroupCreationForm(template_id=task_group_template.id)
+        assert [name for name in cached.fields if name != "form_nonce"] == list(base.fields)
+        for name, field in base.fields.items():
+            assert cached.fields[name].label == field.label
+            assert cached.fields[name].required == field.required
+        assert cached.fields["task_group_template"].initial == task_group_template
+
+    def test_form_class_is_cached(self, task_group_template, django_assert_num_queries):
+        form_class = get_task_group_form_class(task_group_template.id)
+        with django_assert_num_queries(0):
+            assert get_task_group_form_class(str(task_group_template.id)) is form_class
+
+    def test_template_save_invalidates(self, task_group_template):
+        form_class = get_task_group_form_class(task_group_template.id)
+        task_group_template.tasks = [{"title": "Water {sku}", "labels": "water", "subtasks": []}]
+        task_group_template.save()
+        rebuilt = get_task_group_form_class(task_group_template.id)
+        assert rebuilt is not form_class
+        assert rebuilt.task_preview == [{"title": "Water {sku}", "labels": ["water"], "subtasks": []}]
+
+    def test_template_save_changes_shared_version(self, task_group_template, django_capture_on_commit_callbacks):
+        version = get_template_version(task_group_template.id)
+        with django_capture_on_commit_callbacks(execute=True):
+            task_group_template.save()
+        assert get_template_version(task_group_template.id) != version
+
+    def test_create_page_shows_task_preview(self, admin_client, task_group_template):
+        response = admin_client.get(reverse("create-task-group"), {"template_id": task_group_template.id})
+        assert response.status_code == 200
+        assert isinstance(response.context["form"], CachedTaskGroupCreationForm)
+        content = response.content.decode()
+        assert "Sow {sku}" in content
+        assert "@planting" in content
+        assert 'name="token_sku"' in content
+
+    def test_invalid_submission_rerenders_form(self, admin_client, task_group_template):
+        response = admin_client.post(reverse("create-task-group"), {"task_group_template": task_group_template.id})
+        assert response.status_code == 200
+        assert response.context["form"].errors["token_sku"]
+        assert not TaskGroupCreation.objects.exists()
+
+    def test_create_views_require_login(self, client, task_group_template, settings):
+        response = client.get(reverse("create-task-group"), {"template_id": task_group_template.id})
+        assert response.status_code == 302
+        assert response.url.startswith(settings.LOGIN_URL)
+        response = client.post(reverse("resume-task-group-creation", args=[1]))
+        assert response.status_code == 302
+        assert not TaskGroupCreation.objects.exists()
+
+    def test_invalid_template_id(self):
+        form = task_group_creation_form(template_id=99999)
+        assert len(form.fields) == 2
+        assert form.get_token_values() == {}
+
+    def test_get_token_values(self, task_group_template):
+        form = task_group_creation_form(
+            data={
+                "task_group_template": task_group_template.id,
+                "token_sku": "CH001",
+                "token_variety_name": "Habanero",
+            },
+            template_id=task_group_template.id,
+        )
+        assert form.is_valid()
+        assert form.get_token_values() == {"crop": "", "sku": "CH001", "variety_name": "Habanero", "bed": ""}
+
+
+class FakeTodoistAPI:
+    """Returns fixed metadata pages in the shape of the v3 Todoist API"""
+
+    def __init__(self, projects, sections=(), labels=()):
+        self.projects = projects
+        self.sections = sections
+        self.labels = labels
+
+    def get_projects(self):
+        return iter([list(self.projects)])
+
+    def get_sections(self):
+        return iter([list(self.sections)])
+
+    def get_labels(self):
+        return iter([list(self.labels)])
+
+
+@pytest.mark.django_db
+class TestTodoistMirror:
+    """Tests for the local mirror of Todoist projects, sections and labels"""
+
+    def test_refresh_mirror_replaces_rows(self):
+        api = FakeTodoistAPI(
+            projects=[
+                SimpleNamespace(id="1", name="Allotment", parent_id=None),
+                SimpleNamespace(id="2", name="Polytunnel", parent_id="1"),
+            ],
+            sections=[SimpleNamespace(id="10", name="Beds", project_id="1")],
+            labels=[SimpleNamespace(id="20", name="harvest")],
+        )
+        assert refresh_mirror(api) == {"projects": 2, "sections": 1, "labels": 1}
+
+        api.projects = [SimpleNamespace(id="1", name="Plot 12", parent_id=None)]
+        refresh_mirror(api)
+        assert list(TodoistProject.objects.values_list("todo_id", "name")) == [("1", "Plot 12")]
+        assert TodoistSection.objects.get().project_id == "1"
+        assert not is_stale()
+
+    def test_is_stale_when_never_synced(self):
+        assert is_stale()
+
+    def test_normalise_labels(self):
+        known = {"harvest": "harvest", "sow": "Sow"}
+        assert normalise_labels("Harvest, sow , new", known) == "harvest, Sow, new"
+        assert normalise_labels("", known) == ""
+
+    def test_template_form_project_choices(self, sync_settings):
+        TodoistProject.objects.create(todo_id="1", name="Allotment", synced_at=timezone.now())
+        sync_settings.default_project_id = "1"
+        sync_settings.save()
+        template = CropTaskGroupTemplate(title="Old", project_id="999", tasks=[])
+        form = TaskGroupTemplateForm(instance=template)
+        assert form.fields["project_id"].choices == [("", "Default (Allotment)"), ("1", "Allotment"), ("999", "999")]
+
+    def test_template_form_warns_when_not_synced(self, sync_settings):
+        form = TaskGroupTemplateForm()
+        assert "not been synced" in form.fields["project_id"].help_text
+
+        TodoistProject.objects.create(todo_id="1", name="Allotment", synced_at=timezone.now() - timedelta(days=2))
+        assert "may be out of date" in TaskGroupTemplateForm().fields["project_id"].help_text
+
+        TodoistProject.objects.update(synced_at=timezone.now())
+        assert TaskGroupTemplateForm().fields["project_id"].help_text == ""
+
+    def test_refresh_view_reports_api_errors(self, client, admin_user, monkeypatch):
+        def refresh_mirror():
+            raise requests.ConnectionError("Todoist is unreachable")
+
+        monkeypatch.setattr("tasks.views.refresh_mirror", refresh_mirror)
+        client.force_login(admin_user)
+        response = client.post(reverse("todoist-mirror-refresh"), follow=True)
+        assert response.status_code == 200
+        assert [str(message) for message in response.context["messages"]] == [
+            "Could not sync from Todoist: Todoist is unreachable"
+        ]
+
+    def test_template_form_normalises_labels(self, sync_settings):
+        TodoistLabel.objects.create(todo_id="20", name="harvest", synced_at=timezone.now())
+        form = TaskGroupTemplateForm(
+            data={
+                "title": "Chilli",
+                "project_id": "",
+                "tasks": json.dumps([{"title": "Harvest", "labels": "Harvest", "subtasks": [{"title": "x"}]}]),
+            }
+        )
+        assert form.is_valid(), form.errors
+        assert form.cleaned_data["tasks"][0]["labels"] == "harvest"
+
+
+@pytest.fixture
+def profiling_settings(settings, tmp_path):
+    """Install the profiling middleware and write profiles to a temporary log directory"""
+    settings.LOG_DIR = tmp_path
+    settings.PROFILING_SAMPLE_RATE = 0
+    settings.MIDDLEWARE = [*settings.MIDDLEWARE, "tasks.profiling.ProfilingMiddleware"]
+    return settings
+
+
+@pytest.mark.django_db
+class TestRequestProfiling:
+    """Tests for the on-demand request profiling middleware"""
+
+    def test_staff_request_is_profiled(self, client, admin_user, profiling_settings, sync_settings):
+        client.force_login(admin_user)
+        client.get(reverse("home"), {"_profile": "1"})
+        [profile] = list_profiles()
+        assert profile["path"] == "/?_profile=1"
+        assert profile["status"] == 200
+        assert profile["query_count"] > 0
+        assert get_profile_path(profile["name"], ".prof") is not None
+
+    def test_non_staff_request_is_not_profiled(self, client, profiling_settings, sync_settings):
+        client.get(reverse("home"), HTTP_X_PROFILE="1")
+        assert list_profiles() == []
+
+    def test_profile_pages(self, client, admin_user, profiling_settings, sync_settings):
+        client.force_login(admin_user)
+        client.get(reverse("home"), {"_profile": "1"})
+        [profile] = list_profiles()
+        assert client.get(reverse("profile-list")).status_code == 200
+        response = client.get(reverse("profile-detail", args=[profile["name"]]), {"sort": "tottime"})
+        assert response.status_code == 200
+        assert b"SELECT" in response.content
+
+    def test_profile_path_rejects_traversal(self, profiling_settings):
+        assert get_profile_path("../secrets", ".json") is None
+
+
+@pytest.fixture
+def analytics_group(task_group_template):
+    """Create a crop task group with sow and harvest dates"""
+    group = CropTask.objects.create(
+        template=task_group_template, todo_id="300", crop="Chilli", sku="CH001", variety_name="Habanero", bed="A1"
+    )
+    group.subtasks.create(title="Sow CH001", todo_id="301", completed=True, due_date=date(2025, 3, 1))
+    group.subtasks.create(title="Harvest Habanero", todo_id="302", due_date=date(2025, 7, 1))
+    group.subtasks.create(title="CH001 checked in", todo_id="303")
+    return group
+
+
+def cell_values(**filters):
+    return list(
+        CropAnalytics.objects.filter(**filters)
+        .order_by("season", "variety_name", "label")
+        .values("season", "variety_name", "label", "group_count", "task_count", "completed_count", "overdue_count")
+    )
+
+
+@pytest.mark.django_db
+class TestCropAnalytics:
+    """Tests for the cross-season crop analytics rollup"""
+
+    def test_compute_rows(self, analytics_group):
+        rows = compute_rows(records_from_groups([analytics_group]), today=date(2025, 8, 1))
+        by_label = {row.label: row for row in rows}
+        assert set(by_label) == {"", "sow", "planting", "harvest", "processing"}
+
+        total = by_label[""]
+        assert (total.group_count, total.task_count, total.completed_count, total.overdue_count) == (1, 3, 1, 1)
+        assert (total.sow_to_harvest_days, total.sow_to_harvest_count) == (122, 1)
+        assert by_label["sow"].completed_count == 1
+        assert by_label["harvest"].overdue_count == 1
+        assert by_label["harvest"].sow_to_harvest_count == 0
+
+    def test_task_save_refreshes_cell_on_commit(
+        self, analytics_group, django_assert_num_queries, django_capture_on_commit_callbacks
+    ):
+        rebuild()
+        task = Task.objects.get(todo_id="302")
+        task.completed = True
+        with django_capture_on_commit_callbacks(execute=True):
+            # The task's own update and one lookup of its group's cell key; the cell waits for the commit
+            with django_assert_num_queries(2):
+                task.save()
+        assert CropAnalytics.objects.get(label="").completed_count == 2
+
+    def test_task_delete_refreshes_cell(self, analytics_group, django_capture_on_commit_callbacks):
+        rebuild()
+        with django_capture_on_commit_callbacks(execute=True):
+            Task.objects.get(todo_id="303").delete()
+        assert CropAnalytics.objects.get(label="").task_count == 2
+
+    def test_group_save_refreshes_cell_once(self, task_group_template, django_capture_on_commit_callbacks, monkeypatch):
+        refreshed = []
+        monkeypatch.setattr("tasks.analytics.refresh_cell", refreshed.append)
+        # Start clean of keys left by earlier tests, whose transactions were rolled back
+        monkeypatch.setattr("tasks.analytics._dirty", threading.local())
+        with django_capture_on_commit_callbacks(execute=True):
+            group = CropTask.objects.create(
+                template=task_group_template, todo_id="300", crop="Chilli", variety_name="Habanero", bed="A1"
+            )
+            group.save()
+            # Each subtask marks the same cell, which is still refreshed once
+            for index in range(3):
+                group.subtasks.create(title=f"Task {index}", todo_id=f"30{index}")
+        assert refreshed == [(group.created_at.year, "Chilli", "Habanero", "A1")]
+
+    def test_group_move_refreshes_old_and_new_cells(self, analytics_group, django_capture_on_commit_callbacks):
+        rebuild()
+        with django_capture_on_commit_callbacks(execute=True):
+            group = CropTask.objects.get(pk=analytics_group.pk)
+            group.bed = "B2"
+            group.save()
+        assert list(CropAnalytics.objects.filter(label="").values_list("bed", "task_count")) == [("B2", 3)]
+
+    def test_group_delete_refreshes_cell(self, analytics_group, django_capture_on_commit_callbacks):
+        rebuild()
+        with django_capture_on_commit_callbacks(execute=True):
+            CropTask.objects.get(pk=analytics_group.pk).delete()
+        assert not CropAnalytics.objects.exists()
+
+    def test_rebuild_keeps_archived_groups(self, last_season_groups):
+        season = get_current_season() - 1
+        rebuild()
+        before = cell_values(season=season)
+        assert before
+
+        archive_season(season)
+        assert ArchivedTaskGroup.objects.get().subtasks[0]["labels"] == ["sow", "planting"]
+        rebuild(season)
+        assert cell_values(season=season) == before
+
+    def test_analytics_view(self, client, analytics_group, sync_settings):
+        rebuild()
+        response = client.get(reverse("analytics"), {"by": "bed", "crop": "Chilli"})
+        assert response.status_code == 200
+        assert [row["value"] for row in response.context["rows"]] == ["A1"]
+
+        response = client.get(reverse("analytics"), {"by": "label"})
+        assert {row["value"] for row in response.context["rows"]} == {"sow", "planting", "harvest", "processing"}
+
+
+def make_label_rule(sync_settings, **values):
+    """
+    Save a LabelActionRule for ``sync_settings``.
+
+    Only the ``settings`` foreign key is relied on here; the cache tests don't
+    depend on what a rule matches, so any other required field the test doesn't
+    set gets a placeholder value (the first choice, if it has choices).
+    """
+    values.setdefault("settings", sync_settings)
+    for field in LabelActionRule._meta.concrete_fields:
+        if field.name in values or field.primary_key or field.has_default() or field.null:
+            continue
+        if field.choices:
+            values[field.name] = field.choices[0][0]
+        elif isinstance(field, models.BooleanField):
+            values[field.name] = False
+        elif isinstance(field, models.IntegerField | models.FloatField | models.DecimalField):
+            values[field.name] = 0
+        elif isinstance(field, models.JSONField):
+            values[field.name] = {}
+        elif isinstance(field, models.CharField | models.TextField):
+            values[field.name] = "harvest"
+        else:
+            raise TypeError(f"make_label_rule can't fill LabelActionRule.{field.name}; pass it explicitly")
+    return LabelActionRule.objects.create(**values)
+
+
+@pytest.fixture
+def webhook_secret(settings):
+    settings.TODOIST_CLIENT_SECRET = "webhook-test-secret"
+    return settings.TODOIST_CLIENT_SECRET
+
+
+@pytest.fixture
+def fresh_cached_rules(monkeypatch):
+    """Drop the rules cached by earlier tests, whose rows were rolled back without a version change"""
+    monkeypatch.setattr("tasks.label_rules._cached", None)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("fresh_cached_rules")
+class TestCachedLabelRules:
+    """Tests for serving label action rules to the webhook from a per-process cache"""
+
+    def test_cache_is_reused_without_queries(self, sync_settings, django_assert_num_queries):
+        make_label_rule(sync_settings)
+        cached = get_cached_rules()
+        with django_assert_num_queries(0):
+            assert get_cached_rules() is cached
+            assert len(cached.rules) == 1
+
+    def test_rule_save_invalidates(self, sync_settings, django_capture_on_commit_callbacks):
+        cached = get_cached_rules()
+        with django_capture_on_commit_callbacks(execute=True):
+            rule = make_label_rule(sync_settings)
+        rebuilt = get_cached_rules()
+        assert rebuilt is not cached
+        assert rebuilt.rules == [rule]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            rule.delete()
+        assert get_cached_rules().rules == []
+
+    def test_load_is_unchanged_outside_webhook(self, sync_settings, django_assert_num_queries):
+        original = TaskSyncSettings.__dict__.get("load")
+        with serve_cached_rules():
+            cached = TaskSyncSettings.load()
+            with serve_cached_rules():
+                pass
+            # Still patched until the outer block returns
+            assert TaskSyncSettings.load() is cached
+            with django_assert_num_queries(0):
+                assert list(cached.label_action_rules.all()) == []
+        assert TaskSyncSettings.__dict__.get("load") is original
+        assert TaskSyncSettings.load() is not cached
+
+    def test_webhook_reads_no_rules_from_database(self, client, sync_settings, webhook_secret):
+        make_label_rule(sync_settings)
+        make_label_rule(sync_settings)
+        payload = build_payloads(1)[0]
+        body = json.dumps(payload).encode()
+        headers = {"HTTP_X_TODOIST_HMAC_SHA256": sign_payload(body, webhook_secret)}
+
+        with TodoistStub() as stub, redirect_todoist_api(stub.base_url):
+            # The first event loads the rules into this process's cache
+            client.post("/todosync/webhook/", body, content_type="application/json", **headers)
+            with CaptureQueriesContext(connection) as queries:
+                response = client.post("/todosync/webhook/", body, content_type="application/json", **headers)
+
+        assert response.status_code == 200
+        assert count_rule_queries(queries.captured_queries) == 0
+
+    def test_benchmark_compares_real_webhook(self, sync_settings, webhook_secret):
+        make_label_rule(sync_settings)
+        payloads = build_payloads(5)
+        with TodoistStub() as stub, redirect_todoist_api(stub.base_url):
+            before = benchmark_view(get_todosync_webhook(), payloads, webhook_secret)
+            after = benchmark_view(webhook, payloads, webhook_secret)
+        assert before["errors"] == after["errors"] == 0
+        assert before["rule_queries_per_request"] > 0
+        assert after["rule_queries_per_request"] == 0
+
+
+class TestMinifyCss:
+    """Tests for the collectstatic CSS minifier"""
+
+    def test_removes_comments_and_whitespace(self):
+        css = "/* nav */\nheader nav {\n    display: flex;\n    gap: 2rem;\n}\n"
+        assert minify_css(css) == "header nav{display:flex;gap:2rem}"
+
+    def test_keeps_significant_whitespace(self):
+        css = 'a :hover, b { width: calc(1px + 2px); content: "a  ;  }"; }'
+        assert minify_css(css) == 'a :hover,b{width:calc(1px + 2px);content:"a  ;  }"}'
+
+    def test_keeps_licence_comments(self):
+        assert minify_css("/*! MIT */ p { margin: 0 }") == "/*! MIT */ p{margin:0}"
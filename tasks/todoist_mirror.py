@@ -0,0 +1,115 @@
+"""
+Local mirror of Todoist projects, sections and labels.
+
+Forms and validation read these tables instead of calling the Todoist API
+while a page renders. The mirror is refreshed in bulk by the
+``sync_todoist_metadata`` command (e.g. from cron with ``--if-stale``) or on
+demand from the template editor; forms say when it is empty or stale rather
+than reading through to the API.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.timesince import timesince
+from todoist_api_python.api import TodoistAPI
+
+from todosync.models import TaskSyncSettings
+
+from .models import TodoistLabel, TodoistProject, TodoistSection
+
+
+def _flatten(results):
+    """The v3 API returns paginated iterators of lists; flatten them into one list."""
+    items = []
+    for page in results:
+        if isinstance(page, list):
+            items.extend(page)
+        else:
+            items.append(page)
+    return items
+
+
+def _replace(model, rows, now, update_fields):
+    objs = [model(synced_at=now, **row) for row in rows]
+    model.objects.bulk_create(
+        objs, update_conflicts=True, unique_fields=["todo_id"], update_fields=[*update_fields, "synced_at"]
+    )
+    model.objects.exclude(todo_id__in=[row["todo_id"] for row in rows]).delete()
+
+
+def refresh_mirror(api=None):
+    """Fetch all projects, sections and labels from Todoist and replace the local copies."""
+    api = api or TodoistAPI(settings.TODOIST_API_TOKEN)
+    projects = [
+        {"todo_id": str(project.id), "name": project.name, "parent_id": str(project.parent_id or "")}
+        for project in _flatten(api.get_projects())
+    ]
+    sections = [
+        {"todo_id": str(section.id), "name": section.name, "project_id": str(section.project_id)}
+        for section in _flatten(api.get_sections())
+    ]
+    labels = [{"todo_id": str(label.id), "name": label.name} for label in _flatten(api.get_labels())]
+
+    now = timezone.now()
+    with transaction.atomic():
+        _replace(TodoistProject, projects, now, ["name", "parent_id"])
+        _replace(TodoistSection, sections, now, ["name", "project_id"])
+        _replace(TodoistLabel, labels, now, ["name"])
+    return {"projects": len(projects), "sections": len(sections), "labels": len(labels)}
+
+
+def get_synced_at():
+    return TodoistProject.objects.aggregate(synced_at=Max("synced_at"))["synced_at"]
+
+
+def is_stale():
+    synced_at = get_synced_at()
+    return synced_at is None or synced_at < timezone.now() - timedelta(seconds=settings.TODOIST_MIRROR_TTL)
+
+
+def get_sync_warning():
+    """Why the mirrored choices may be incomplete, or an empty string when they are fresh."""
+    synced_at = get_synced_at()
+    if synced_at is None:
+        return "Todoist projects have not been synced yet. Refresh from Todoist to choose a project."
+    if synced_at < timezone.now() - timedelta(seconds=settings.TODOIST_MIRROR_TTL):
+        return f"Todoist projects were last synced {timesince(synced_at)} ago and may be out of date."
+    return ""
+
+
+def get_project_choices(current=""):
+    """Project choices for a form, keeping ``current`` selectable even if it is no longer mirrored."""
+    choices = list(TodoistProject.objects.values_list("todo_id", "name"))
+    if current and current not in {todo_id for todo_id, _ in choices}:
+        choices.append((current, current))
+    return choices
+
+
+def get_default_project_name():
+    default_project_id = TaskSyncSettings.load().default_project_id
+    if not default_project_id:
+        return "Inbox"
+    project = TodoistProject.objects.filter(todo_id=default_project_id).first()
+    return project.name if project else default_project_id
+
+
+def get_known_labels():
+    """Mirrored label names keyed by their lowercased form."""
+    return {name.lower(): name for name in TodoistLabel.objects.values_list("name", flat=True)}
+
+
+def normalise_labels(labels, known_labels):
+    """
+    Match comma-separated label names to the spelling of existing Todoist labels.
+
+    Todoist creates any label it doesn't recognise, so ``Harvest`` next to an
+    existing ``harvest`` label would otherwise become a second label.
+    """
+    names = [name.strip() for name in (labels or "").split(",") if name.strip()]
+    if not names:
+        return labels or ""
+    return ", ".join(known_labels.get(name.lower(), name) for name in names)
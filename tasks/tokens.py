@@ -0,0 +1,16 @@
+"""
+Helpers for template task text.
+
+Template titles and descriptions contain ``{token}`` placeholders filled from
+a group's token values, and labels are stored as comma-separated names.
+"""
+
+
+def render_title(title, token_values):
+    for name, value in token_values.items():
+        title = title.replace(f"{{{name}}}", str(value))
+    return title
+
+
+def split_labels(labels):
+    return [label.strip() for label in (labels or "").split(",") if label.strip()]
@@ -0,0 +1,23 @@
+"""
+Version tokens for per-process caches.
+
+Compiled state such as the creation form classes is kept in each worker
+process, tagged with a version token read from the shared cache. Changing the
+underlying rows writes a new random token once the transaction commits, so
+every worker sees the change on its next read. A token that was evicted or
+never written is replaced by a fresh one, which also reads as a change.
+"""
+
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def get_version(key):
+    return cache.get_or_set(key, lambda: uuid.uuid4().hex, timeout=None)
+
+
+def bump_version(key):
+    """Give ``key`` a new token when the current transaction commits."""
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, timeout=None))
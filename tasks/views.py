@@ -1,17 +1,40 @@
+import asyncio
+import io
+import json
+import pstats
+
+import requests
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
-from django.shortcuts import get_object_or_404, render
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q, Sum
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from neapolitan.views import CRUDView
 
 from todosync.models import BaseParentTask, BaseTaskGroupTemplate, Task
 
-from .models import CropTaskGroupTemplate
+from .creation import PARENT_PATH, GroupRequest, count_nodes, create_groups, get_sync_client
+from .events import broker
+from .forms import TaskGroupTemplateForm, task_group_creation_form
+from .idempotency import make_idempotency_key
+from .label_rules import get_todosync_webhook, serve_cached_rules
+from .models import CropAnalytics, CropTaskGroupTemplate, TaskGroupCreation
+from .profiling import get_profile_path, list_profiles
+from .todoist_mirror import get_synced_at, refresh_mirror
 
 
 class TaskGroupTemplateCRUDView(LoginRequiredMixin, CRUDView):
     model = CropTaskGroupTemplate
     fields = ["title", "description", "project_id", "tasks"]
+    form_class = TaskGroupTemplateForm
     url_base = "taskgrouptemplate"
 
     def get_context_data(self, **kwargs):
@@ -19,9 +42,64 @@ class TaskGroupTemplateCRUDView(LoginRequiredMixin, CRUDView):
         parent_task_class = self.model.parent_task_class
         if parent_task_class:
             context["token_names"] = parent_task_class.get_token_field_names()
+        context["todoist_synced_at"] = get_synced_at()
         return context
 
 
+@require_POST
+@staff_member_required
+def refresh_todoist_mirror(request):
+    """Refresh the local copy of Todoist projects, sections and labels, then go back."""
+    try:
+        counts = refresh_mirror()
+    except requests.RequestException as e:
+        messages.error(request, f"Could not sync from Todoist: {e}")
+    else:
+        messages.success(
+            request,
+            f"Synced {counts['projects']} projects, {counts['sections']} sections and {counts['labels']} labels "
+            "from Todoist.",
+        )
+    next_url = request.POST.get("next")
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = "taskgrouptemplate-list"
+    return redirect(next_url)
+
+
+PROFILE_SORT_KEYS = ["cumulative", "tottime", "ncalls"]
+
+
+@staff_member_required
+def profile_list(request):
+    return render(request, "profiles/profile_list.html", {"profiles": list_profiles(), "title": "Request profiles"})
+
+
+@staff_member_required
+def profile_detail(request, name):
+    metadata_path = get_profile_path(name, ".json")
+    stats_path = get_profile_path(name, ".prof")
+    if metadata_path is None:
+        raise Http404("Profile not found")
+
+    if request.GET.get("download") and stats_path:
+        return FileResponse(stats_path.open("rb"), as_attachment=True, filename=stats_path.name)
+
+    stats = ""
+    if stats_path:
+        stream = io.StringIO()
+        sort = request.GET.get("sort")
+        if sort not in PROFILE_SORT_KEYS:
+            sort = "cumulative"
+        pstats.Stats(str(stats_path), stream=stream).sort_stats(sort).print_stats(50)
+        stats = stream.getvalue()
+
+    return render(
+        request,
+        "profiles/profile_detail.html",
+        {"profile": json.loads(metadata_path.read_text()), "stats": stats, "title": name},
+    )
+
+
 def home(request):
     templates = BaseTaskGroupTemplate.objects.all()
 
@@ -54,6 +132,76 @@ def home(request):
             "due_this_month_completed": due_this_month_completed,
             "completion_pct": completion_pct,
             "current_month": now.strftime("%B %Y"),
+            "month_start": month_start,
+            "month_end": month_end,
+        },
+    )
+
+
+ANALYTICS_DIMENSIONS = {
+    "crop": "Crop",
+    "variety_name": "Variety",
+    "bed": "Bed",
+    "season": "Season",
+    "label": "Label",
+}
+
+
+def analytics(request):
+    """Crop performance across seasons, read from the ``CropAnalytics`` rollup."""
+    by = request.GET.get("by")
+    if by not in ANALYTICS_DIMENSIONS:
+        by = "crop"
+    filters = {name: request.GET.get(name, "") for name in ["season", "crop", "bed", "label"]}
+
+    # Unlabelled rows hold each cell's totals; grouping by label reads the per-label rows instead
+    if by == "label" and not filters["label"]:
+        cells = CropAnalytics.objects.exclude(label="")
+    else:
+        cells = CropAnalytics.objects.filter(label=filters["label"])
+    if filters["season"].isdigit():
+        cells = cells.filter(season=int(filters["season"]))
+    if filters["crop"]:
+        cells = cells.filter(crop=filters["crop"])
+    if filters["bed"]:
+        cells = cells.filter(bed=filters["bed"])
+
+    rows = list(
+        cells.values(by)
+        .annotate(
+            groups=Sum("group_count"),
+            tasks=Sum("task_count"),
+            completed=Sum("completed_count"),
+            overdue=Sum("overdue_count"),
+            sow_to_harvest_days=Sum("sow_to_harvest_days"),
+            sow_to_harvest_count=Sum("sow_to_harvest_count"),
+        )
+        .order_by(by)
+    )
+    for row in rows:
+        row["value"] = row[by]
+        row["completion_pct"] = round(row["completed"] / row["tasks"] * 100) if row["tasks"] else None
+        row["overdue_pct"] = round(row["overdue"] / row["tasks"] * 100) if row["tasks"] else 0
+        if row["sow_to_harvest_count"]:
+            row["sow_to_harvest"] = round(row["sow_to_harvest_days"] / row["sow_to_harvest_count"])
+
+    options = CropAnalytics.objects.filter(label="")
+    return render(
+        request,
+        "analytics.html",
+        {
+            "rows": rows,
+            "by": by,
+            "by_label": ANALYTICS_DIMENSIONS[by],
+            "dimensions": ANALYTICS_DIMENSIONS,
+            "filters": filters,
+            "seasons": options.values_list("season", flat=True).distinct().order_by("-season"),
+            "crops": options.exclude(crop="").values_list("crop", flat=True).distinct().order_by("crop"),
+            "beds": options.exclude(bed="").values_list("bed", flat=True).distinct().order_by("bed"),
+            "labels": CropAnalytics.objects.exclude(label="")
+            .values_list("label", flat=True)
+            .distinct()
+            .order_by("label"),
         },
     )
 
@@ -69,8 +217,196 @@ def template_tasks(request, pk):
     parent_tasks = (
         parent_task_model.objects.filter(template=template).select_related("template").prefetch_related("subtasks")
     )
+    stalled = Q(status=TaskGroupCreation.Status.PENDING, updated_at__lt=timezone.now() - TaskGroupCreation.STALE_AFTER)
+    incomplete_creations = template.creations.filter(Q(status=TaskGroupCreation.Status.PARTIAL) | stalled).order_by(
+        "created_at"
+    )
     return render(
         request,
         "template_tasks.html",
-        {"template": template, "parent_tasks": parent_tasks},
+        {"template": template, "parent_tasks": parent_tasks, "incomplete_creations": incomplete_creations},
+    )
+
+
+@login_required
+def create_task_group(request):
+    """
+    Create a task group from a template, idempotently.
+
+    The form comes from the per-template class cache, and its task preview is
+    shown above it.
+
+    Repeated submissions of the same form return the group that was already
+    created instead of calling Todoist again. A failed creation with nothing
+    created is retried, and a partial one resumes with the missing tasks.
+    """
+    if request.method != "POST":
+        template_id = request.GET.get("template_id", "")
+        return _render_create_form(request, task_group_creation_form(template_id=template_id), template_id)
+
+    template_id = request.POST.get("task_group_template", "")
+    form = task_group_creation_form(request.POST, template_id=template_id)
+    if not form.is_valid():
+        return _render_create_form(request, form, template_id)
+
+    template = form.cleaned_data["task_group_template"]
+    if settings.DRY_RUN_TASK_CREATION:
+        messages.info(request, "DRY_RUN_TASK_CREATION is enabled; no tasks were created.")
+        return redirect("template-tasks", pk=template.pk)
+
+    token_values = form.get_token_values()
+    description = form.cleaned_data.get("description", "")
+    key = make_idempotency_key(template.pk, token_values, description, form.cleaned_data["form_nonce"])
+    creation, created = TaskGroupCreation.objects.get_or_create(
+        key=key,
+        defaults={
+            "template": template,
+            "token_values": token_values,
+            "description": description,
+            "tasks": template.tasks or [],
+            "expected_task_count": count_nodes(template.tasks),
+        },
+    )
+    if not created and not (creation.can_retry() and _claim(creation)):
+        return _existing_creation_response(request, creation)
+    return _run_creation(request, creation)
+
+
+def _render_create_form(request, form, template_id):
+    return render(
+        request,
+        "create_task_group.html",
+        {"form": form, "template_id": template_id},
     )
+
+
+@login_required
+@require_POST
+def resume_task_group_creation(request, pk):
+    """Create the tasks a partial or stalled creation is missing, under its existing parent task."""
+    creation = get_object_or_404(TaskGroupCreation, pk=pk)
+    if not creation.can_resume() or not _claim(creation):
+        return _existing_creation_response(request, creation)
+    return _run_creation(request, creation)
+
+
+def _claim(creation):
+    """Mark ``creation`` pending unless another request changed it first."""
+    claimed = TaskGroupCreation.objects.filter(
+        pk=creation.pk, status=creation.status, updated_at=creation.updated_at
+    ).update(status=TaskGroupCreation.Status.PENDING, updated_at=timezone.now())
+    return bool(claimed)
+
+
+def _run_creation(request, creation):
+    group = GroupRequest(
+        template=BaseTaskGroupTemplate.objects.get(pk=creation.template_id),
+        token_values=creation.token_values,
+        key=creation.key,
+        tasks=creation.tasks,
+        description=creation.description,
+        created_nodes=dict(creation.created_nodes),
+        parent_task=creation.parent_task,
+    )
+
+    def save_progress(groups):
+        creation.created_nodes = dict(group.created_nodes)
+        creation.parent_task = group.parent_task
+        creation.created_task_count = group.created_count
+        creation.save(update_fields=["created_nodes", "parent_task", "created_task_count", "updated_at"])
+
+    try:
+        create_groups(get_sync_client(), [group], on_batch=save_progress)
+    except requests.RequestException as e:
+        _record_interrupted(creation)
+        if creation.status == TaskGroupCreation.Status.PARTIAL:
+            messages.error(
+                request,
+                f"Todoist request failed ({e}); {_missing_count(creation)} tasks were not created. "
+                "Resume to create them.",
+            )
+        else:
+            messages.error(request, f"Todoist request failed ({e}); nothing was created.")
+        return redirect("template-tasks", pk=creation.template_id)
+    except Exception:
+        _record_interrupted(creation)
+        raise
+
+    if group.is_complete:
+        creation.status = TaskGroupCreation.Status.COMPLETED
+        messages.success(request, f"Created {creation.created_task_count} tasks in Todoist.")
+    elif group.created_nodes:
+        creation.status = TaskGroupCreation.Status.PARTIAL
+        messages.warning(request, f"{_missing_count(creation)} tasks were not created. Resume to create them.")
+    else:
+        creation.status = TaskGroupCreation.Status.FAILED
+        messages.error(request, "Todoist rejected the task group; nothing was created.")
+    creation.save(update_fields=["status", "updated_at"])
+    return redirect("template-tasks", pk=creation.template_id)
+
+
+def _record_interrupted(creation):
+    # Batches already saved stay recorded, so whatever was created can be resumed
+    creation.refresh_from_db()
+    creation.status = TaskGroupCreation.Status.PARTIAL if creation.created_nodes else TaskGroupCreation.Status.FAILED
+    creation.save(update_fields=["status", "updated_at"])
+
+
+def _missing_count(creation):
+    return creation.expected_task_count - creation.created_task_count + (PARENT_PATH not in creation.created_nodes)
+
+
+def _existing_creation_response(request, creation):
+    if creation.is_stale():
+        messages.warning(
+            request, "These tasks stopped part way through being created. Resume the creation to finish it."
+        )
+    elif creation.status == TaskGroupCreation.Status.PENDING:
+        messages.info(request, "These tasks are still being created.")
+    elif creation.status == TaskGroupCreation.Status.PARTIAL:
+        messages.warning(
+            request,
+            f"These tasks were already submitted, but {_missing_count(creation)} of them were not created. "
+            "Resume the creation to create them.",
+        )
+    else:
+        messages.info(request, "These tasks were already created.")
+    return redirect("template-tasks", pk=creation.template_id)
+
+
+@csrf_exempt
+def webhook(request, *args, **kwargs):
+    """todosync's webhook view, with label action rules read from the per-process cache."""
+    with serve_cached_rules():
+        return get_todosync_webhook()(request, *args, **kwargs)
+
+
+# Seconds between keep-alive comments, so proxies don't drop idle streams
+EVENT_STREAM_KEEPALIVE = 15
+
+
+async def events(request):
+    """
+    Server-sent events stream of task-group creation and task completion changes.
+
+    Under WSGI a streamed response is read to the end before it is sent, so an
+    endless stream would hold a server thread forever. There the view answers
+    204 No Content instead, which tells the browser's EventSource to stop
+    reconnecting; pages then simply don't update live.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    async def stream():
+        yield "retry: 5000\n\n"
+        with broker.subscribe() as queue:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), EVENT_STREAM_KEEPALIVE)
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response